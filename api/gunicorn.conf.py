@@ -0,0 +1,22 @@
+# Serve the dashboard and predictions on every core: `gunicorn -c gunicorn.conf.py "run:create_app()"` from `api/`
+import gc
+import multiprocessing
+
+from config import Config
+
+bind = '127.0.0.1:5000'
+workers = multiprocessing.cpu_count()
+threads = 4
+timeout = 60
+
+# Create the app, loading predictor sets, indexes and results cubes, once in the master before forking so every worker
+# shares its pages. Predictor sets and results cubes are memory-mapped and shared through the page cache regardless.
+preload_app = True
+
+# Callbacks from one page may land on different workers, so the frames passed between them are kept on disk
+Config.FRAME_STORE = 'disk'
+
+
+def pre_fork(server, worker):
+    # Keep the garbage collector from touching (and so copying) the pages of objects loaded before the fork
+    gc.freeze()
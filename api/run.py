@@ -1,16 +1,28 @@
 from flask import Flask, jsonify
-from sports_bettors.dash import add_sb_dash
+from sports_bettors.dash import add_sb_dash, warmup
+from sports_bettors.service import predict_blueprint
 
-app = Flask(__name__)
 
+def create_app(preload: bool = True) -> Flask:
+    """
+    Build the app serving the dashboard and predictions. With `preload` read-only data is loaded now rather than on
+    the first request, so a server creating the app before it forks workers (see gunicorn.conf.py) loads it once.
+    """
+    app = Flask(__name__)
+    app.register_blueprint(predict_blueprint)
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def catch_all(path):
-    return jsonify({'message': 'Greetings from the Backend'})
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def catch_all(path):
+        return jsonify({'message': 'Greetings from the Backend'})
 
+    app = add_sb_dash(app, routes_pathname_prefix='/')
+
+    if preload:
+        warmup()
+
+    return app
 
-app = add_sb_dash(app, routes_pathname_prefix='/')
 
 if __name__ == '__main__':
-    app.run(host='127.0.0.1', port=5000)
+    create_app().run(host='127.0.0.1', port=5000)
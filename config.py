@@ -18,6 +18,18 @@ class Config(object):
     DATA_DIR = os.path.join(ROOT_DIR, 'data')
     RESULTS_DIR = os.path.join(ROOT_DIR, 'results')
     TEST_RESULTS_DIR = os.path.join(ROOT_DIR, 'tests', 'results')
+    CACHE_DIR = os.path.join(ROOT_DIR, 'cache')
+    STAN_CACHE_BYTES = 4 * 1024 ** 3
+    # Dashboard results are cached in each process ('memory') or in CACHE_DIR shared by every worker ('disk')
+    RESULTS_CACHE = 'memory'
+    RESULTS_CACHE_BYTES = 256 * 1024 ** 2
+    # Frames passed between dashboard callbacks stay on the server, in each process ('memory', a single worker) or in
+    # CACHE_DIR ('disk', needed when callbacks may land on different workers), and expire after FRAME_STORE_TTL seconds
+    FRAME_STORE = 'memory'
+    FRAME_STORE_BYTES = 128 * 1024 ** 2
+    FRAME_STORE_TTL = 60 * 60
+    # Threads per process computing dashboard results off the request threads
+    RESULTS_WORKERS = 2
     sb_version = 'v2'
     CLOUD_DATA = 's3://scott-p-white/website/data'
     CLOUD_RESULTS = 's3://scott-p-white/website/results'
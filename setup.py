@@ -11,12 +11,14 @@ setup(
         'sb_download = sports_bettors.download:download_cli',
         'sb_curate = sports_bettors.curate:curate_data',
         'sb_run_experiments = sports_bettors.experiments:run_experiments',
-        'sb_predict = sports_bettors.api:api_cli',
+        'sb_predict = sports_bettors.serving:predict_cli',
         'sb_generate_predictors = sports_bettors.api:create_predictor_sets',
+        'sb_precompute_results = sports_bettors.dashboard.precompute:precompute_results_cli',
         'sb_upload = sports_bettors.upload:upload'
     ]},
     install_requires=[
         'pandas',
+        'pyarrow',
         'numpy',
         'matplotlib',
         'scipy',
@@ -27,6 +29,7 @@ setup(
         'pystan',
         'beautifulsoup4',
         'flask',
+        'gunicorn; platform_system != "Windows"',
         'plotly',
         'dash',
         'dash-bootstrap-components',
@@ -6,7 +6,10 @@ from typing import Tuple
 
 from sports_bettors.utils.nfl.models import NFLBettingAid
 from sports_bettors.utils.college_football.models import CollegeFootballBettingAid
-from sports_bettors.base import BetPredictor, BaseBettingAid
+from sports_bettors.base import BetPredictor
+from sports_bettors.predictor_set import CompiledPredictorSet
+from sports_bettors.registry import registry, predictor_set_path, compiled_set_path
+from sports_bettors.utils.artifact import FitArtifact, artifact_name
 
 from config import Config, logger
 
@@ -21,15 +24,15 @@ class SportsPredictor(object):
     def __init__(self, league: str, version: str = Config.sb_version):
         self.league = league
         self.predictors = None
+        self.compiled = None
         self.version = version
 
     def load(self):
         """
-        Load predictor set
+        Load predictor set, shared with the rest of the process through the registry
         """
-        logger.info('Loading predictor set for {}'.format(self.league))
-        with open(os.path.join(self.load_dir, self.league, 'predictor_set_{}.pkl'.format(self.version)), 'rb') as fp:
-            self.predictors = pickle.load(fp)
+        predictor_set = registry.get(self.league, self.version)
+        self.predictors, self.compiled = predictor_set.predictors, predictor_set.compiled
 
     def predict(self, random_effect: str, feature_set: str, inputs: dict) -> dict:
         """
@@ -43,35 +46,30 @@ class SportsPredictor(object):
         assert random_effect in aid.random_effects
         assert 'RandomEffect' in inputs.keys()
 
-        outputs = {}
-        for response in aid.responses:
-            key = (random_effect, feature_set, response)
-            if key in self.predictors.keys():
-                output = self.predictors[key](inputs)
-                outputs[(random_effect, feature_set, response)] = output
-
-        return outputs
+        return self.compiled.predict(random_effect, feature_set, inputs)
 
     @staticmethod
-    def _get_calculator(aid: BaseBettingAid) -> Tuple[dict, Tuple[float, float]]:
+    def _get_calculator(artifact: FitArtifact) -> Tuple[dict, Tuple[float, float]]:
         """
-        Use the summary of a fit betting aid to create a small predictor dictionary
+        Use the parameter table of a fit artifact to create a small predictor dictionary
         """
+        parameters = artifact.parameters
+
         # Random effects
-        df_re = aid.summary[aid.summary['labels'].str.startswith('a[')].reset_index(drop=True)
-        df_re['labels'] = df_re['labels'].map(aid.random_effect_inv)
+        df_re = parameters[parameters['labels'].str.startswith('a[')].reset_index(drop=True)
+        df_re['labels'] = df_re['labels'].map(artifact.random_effect_inv)
 
         # Coefficients
-        df_coefs = aid.summary[aid.summary['labels'].str.contains('^b[0-9]', regex=True)].\
-            assign(labels=aid.features)
+        df_coefs = parameters[parameters['labels'].str.contains('^b[0-9]', regex=True)].\
+            assign(labels=artifact.features)
 
         # Global intercept
-        intercept = aid.summary[aid.summary['labels'] == 'mu_a']['mean'].iloc[0]
-        intercept_sd = aid.summary[aid.summary['labels'] == 'mu_a']['sd'].iloc[0]
+        intercept = parameters[parameters['labels'] == 'mu_a']['mean'].iloc[0]
+        intercept_sd = parameters[parameters['labels'] == 'mu_a']['sd'].iloc[0]
 
         # Sigma for continuous responses
-        sigma = aid.summary[aid.summary['labels'] == 'sigma_y']['mean'].iloc[0]
-        sigma_sd = aid.summary[aid.summary['labels'] == 'sigma_y']['sd'].iloc[0]
+        sigma = parameters[parameters['labels'] == 'sigma_y']['mean'].iloc[0]
+        sigma_sd = parameters[parameters['labels'] == 'sigma_y']['sd'].iloc[0]
 
         # Convert to lightweight predictor
         calculator = {
@@ -86,11 +84,26 @@ class SportsPredictor(object):
         }
 
         # Add noise if continuous response
-        if aid.response_distributions[aid.response] != 'bernoulli_logit':
+        if artifact.response_distribution != 'bernoulli_logit':
             calculator['noise'] = (sigma - sigma_sd, sigma, sigma + sigma_sd)
 
         return calculator, (intercept, intercept_sd)
 
+    @staticmethod
+    def _load_artifact(model_dir: str) -> FitArtifact:
+        """
+        Load the compact artifact of a fit, falling back to the pickled aid for fits saved before artifacts existed
+        """
+        if os.path.exists(os.path.join(model_dir, artifact_name(Config.sb_version))):
+            return FitArtifact.load(os.path.join(model_dir, artifact_name(Config.sb_version)))
+
+        aid_path = os.path.join(model_dir, 'aid_{}.pkl'.format(Config.sb_version))
+        if not os.path.exists(aid_path):
+            return None
+        logger.info('No artifact in {}, loading the pickled aid'.format(model_dir))
+        with open(aid_path, 'rb') as fp:
+            return FitArtifact.from_aid(pickle.load(fp))
+
     def generate_predictor_set(self):
         """
         Generate predict sets for each league from all the previously fit models
@@ -98,25 +111,28 @@ class SportsPredictor(object):
         logger.info('Generating Predictor Sets for {}'.format(self.league))
         predictors = {}
         base_dir = os.path.join(Config.RESULTS_DIR, 'sports_bettors', self.league)
-        for response in [d for d in os.listdir(os.path.join(base_dir)) if '.pkl' not in d]:
+        # Only response directories hold models; predictor sets and anything else written next to them are skipped
+        responses = [d for d in os.listdir(base_dir) if d in self.aids[self.league].responses]
+        for response in responses:
             for feature_set in os.listdir(os.path.join(base_dir, response)):
                 for random_effect in os.listdir(os.path.join(base_dir, response, feature_set)):
                     # Load predictor
-                    aid_path = os.path.join(base_dir, response, feature_set, random_effect,
-                                            'aid_{}.pkl'.format(Config.sb_version))
-                    if not os.path.exists(aid_path):
+                    artifact = self._load_artifact(os.path.join(base_dir, response, feature_set, random_effect))
+                    if artifact is None:
                         continue
-                    with open(aid_path, 'rb') as fp:
-                        aid = pickle.load(fp)
-                    calculator, re_params = self._get_calculator(aid)
-                    predictor = BetPredictor(scales=aid.scales, calculator=calculator, re_params=re_params)
+                    calculator, re_params = self._get_calculator(artifact)
+                    predictor = BetPredictor(scales=artifact.scales, calculator=calculator, re_params=re_params)
                     predictors[(random_effect, feature_set, response)] = predictor
 
+        # Write atomically so processes serving the previous set never load a partial file
         logger.info('Saving Predictor Set for {}'.format(self.league))
-        with open(os.path.join(base_dir, 'predictor_set_{}.pkl'.format(Config.sb_version)),
-                  'wb') as fp:
+        save_path = predictor_set_path(self.league, Config.sb_version)
+        with open('{}.{}.tmp'.format(save_path, os.getpid()), 'wb') as fp:
             pickle.dump(predictors, fp)
+        os.replace('{}.{}.tmp'.format(save_path, os.getpid()), save_path)
         self.predictors = predictors
+        self.compiled = CompiledPredictorSet.from_predictors(predictors, self.league, Config.sb_version)
+        self.compiled.save(compiled_set_path(self.league, Config.sb_version))
 
 
 def api(league: str, random_effect: str, feature_set: str, inputs: dict, display_output: bool = False):
@@ -1,21 +1,27 @@
 import os
+import re
+import time
 import pickle
+import platform
+import sysconfig
 
 from typing import Tuple
-from collections import namedtuple
 
 import pandas as pd
 import numpy as np
 
-import pystan
-
+from sports_bettors.utils.cache import DiskCache
+from sports_bettors.utils.inference import flatten_pars, split_pars, summarize_draws, summarize_fitted, \
+    laplace_draws
+from sports_bettors.utils.random_intercept import fit_random_intercept
+from sports_bettors.utils.features import Features, create_features
+from sports_bettors.utils.dataset import LeagueDataset
+from sports_bettors.utils.store import read_curated
+from sports_bettors.utils.artifact import FitArtifact, artifact_name
 
 from config import Config, logger
 
 
-Features = namedtuple('Features', ['label', 'features'])
-
-
 class BetPredictor(object):
     """
     Lightweight predictor that accepts a dictionary of features (name: val) and random_effect ('RandomEffect': val)
@@ -76,6 +82,68 @@ class BetPredictor(object):
 
         return output
 
+    def _batch_arrays(self) -> dict:
+        """
+        Scales, coefficients (features x bound) and intercepts (random effect x bound, global mean / sd in the last row)
+        as arrays. Built on first use since pickled predictors predate them.
+        """
+        arrays = getattr(self, '_arrays', None)
+        if arrays is None:
+            features = list(self.scales.keys())
+            re_mean, re_sd = self.re_params
+            re_default = (re_mean - re_sd, re_mean, re_mean + re_sd)
+            arrays = {
+                'features': features,
+                'centers': np.array([self.scales[feature][0] for feature in features], dtype=float),
+                'scales': np.array([self.scales[feature][1] for feature in features], dtype=float),
+                'coefficients': np.array([self.calculator['coefficients'][feature] for feature in features],
+                                         dtype=float).reshape(len(features), 3),
+                'levels': pd.Index(list(self.calculator['random_effect'].keys())),
+                'intercepts': np.array(list(self.calculator['random_effect'].values()) + [re_default], dtype=float)
+            }
+            self._arrays = arrays
+        return arrays
+
+    def predict_batch(self, X) -> dict:
+        """
+        Vectorized `__call__` for a DataFrame (or structured array / dict of arrays) of N rows with a 'RandomEffect'
+        column and feature columns. Returns the same keys as `__call__` with arrays of length N. As with `__call__`,
+        unknown random effects get the global intercept and missing features are imputed to their training mean.
+        """
+        X = X if isinstance(X, pd.DataFrame) else pd.DataFrame(X)
+        arrays = self._batch_arrays()
+
+        # Row of the intercept table for each random effect, unknown values point to the global intercept
+        if 'RandomEffect' in X.columns:
+            re_idx = arrays['levels'].get_indexer(X['RandomEffect'])
+            re_idx[re_idx < 0] = arrays['intercepts'].shape[0] - 1
+        else:
+            re_idx = np.full(X.shape[0], arrays['intercepts'].shape[0] - 1)
+
+        # Scale; absent features are zero once scaled
+        x = np.zeros((X.shape[0], len(arrays['features'])))
+        for fdx, feature in enumerate(arrays['features']):
+            if feature in X.columns:
+                x[:, fdx] = X[feature].values.astype(float)
+            else:
+                x[:, fdx] = arrays['centers'][fdx]
+        x = (x - arrays['centers']) / arrays['scales']
+
+        mu = arrays['intercepts'][re_idx] + x.dot(arrays['coefficients'])
+        output = {'mu': {'lb': mu[:, 0], 'mean': mu[:, 1], 'ub': mu[:, 2]}}
+
+        if 'noise' in self.calculator.keys():
+            output['sigma'] = {bound: np.full(X.shape[0], float(self.calculator['noise'][bdx]))
+                               for bdx, bound in enumerate(['lb', 'mean', 'ub'])}
+
+        return output
+
+    def __getstate__(self) -> dict:
+        # Batch arrays are rebuilt on first use
+        state = self.__dict__.copy()
+        state.pop('_arrays', None)
+        return state
+
 
 class BaseBettingAid(object):
     """
@@ -86,7 +154,7 @@ class BaseBettingAid(object):
 
     # Feature Definitions
     feature_creators = {
-        'x3': lambda row: row['x1'] - row['x2'],
+        'x3': lambda d: d['x1'] - d['x2'],
     }
 
     # Feature set to use for modeling (each value must be in the curated dataset or as a key in feature_creators)
@@ -117,10 +185,24 @@ class BaseBettingAid(object):
         'y2': 'linear',
     }
 
+    # Shared curated data (see LeagueDataset), not saved with the aid
+    dataset = None
+
+    # Inference algorithms: full sampling, variational inference, posterior mode with a laplace approximation, and a
+    # closed-form REML fit for linear responses that needs neither stan nor a compiler
+    inference_modes = ['nuts', 'advi', 'map', 'reml']
+
     # I/O
+    league = None
     input_path = os.path.join(Config.DATA_DIR, 'sports_bettors', 'curated')
     results_dir = os.path.join(Config.RESULTS_DIR, 'sports_bettors')
 
+    # Compiled stan models are shared by every aid; the generated code only varies by feature count and response
+    model_cache = DiskCache(os.path.join(Config.CACHE_DIR, 'stan_models'), max_bytes=Config.STAN_CACHE_BYTES)
+
+    # Step size, inverse metric, and final draws of finished NUTS fits to warm-start sibling fits
+    adaptation_cache = DiskCache(os.path.join(Config.CACHE_DIR, 'adaptation'), max_bytes=256 * 1024 ** 2)
+
     def __init__(self,
                  # I/O
                  version: str = Config.sb_version,
@@ -134,7 +216,14 @@ class BaseBettingAid(object):
                  response: str = 'Margin',
                  iterations: int = 1000,
                  chains: int = 2,
-                 verbose: bool = True
+                 n_jobs: int = -1,
+                 inference: str = 'nuts',
+                 reuse_adaptation: bool = False,
+                 store_fitted: bool = True,
+                 dataset: LeagueDataset = None,
+                 verbose: bool = True,
+                 cache_models: bool = True,
+                 vectorized: bool = True
                  ):
         # I/O
         self.version = version
@@ -152,13 +241,22 @@ class BaseBettingAid(object):
         self.response = response
         self.iterations = iterations
         self.chains = chains
+        self.n_jobs = n_jobs
+        self.inference = inference
+        self.reuse_adaptation = reuse_adaptation
+        self.store_fitted = store_fitted
+        self.dataset = dataset
         self.verbose = verbose
+        self.cache_models = cache_models
+        self.vectorized = vectorized
         self.model = None
         self.summary = None
+        self.fit_metadata = {}
         self.predictor = None
 
         # Quality check on inputs
         assert self.random_effect in self.random_effects
+        assert self.inference in self.inference_modes
 
         # Make dirs
         self.results_dir = os.path.join(self.results_dir, response, features, random_effect)
@@ -171,7 +269,11 @@ class BaseBettingAid(object):
         """
         Load data
         """
+        if (self.dataset is not None) and (input_path is None):
+            return self.dataset.df
         logger.info('Loading Curated Data')
+        if (self.league is not None) and (input_path is None):
+            return read_curated(self.league)
         input_path = self.input_path if input_path is None else input_path
         if not os.path.exists(input_path):
             raise FileNotFoundError('No curated data, run `sb_curate`')
@@ -181,30 +283,45 @@ class BaseBettingAid(object):
         return df[self.random_effect].astype(str)
 
     def _engineer_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        for feature in self.features:
-            if feature in self.feature_creators.keys():
-                df[feature] = df.apply(lambda row: self.feature_creators[feature](row), axis=1)
-        return df
+        return create_features(df, self.features, self.feature_creators)
 
     def fit_transform(self, df: pd.DataFrame, skip_scaling: bool = False) -> dict:
         """
-        Create features and scale
+        Create features and scale. The shared dataset's data is only transformed once per feature set, response, and
+        random effect; later calls get the memoized, read-only arrays.
+        """
+        if (self.dataset is not None) and (df is self.dataset.df):
+            pystan_data, scales, random_effect_map = self.dataset.design(self, skip_scaling=skip_scaling)
+            self.random_effect_map = dict(random_effect_map)
+            self.random_effect_inv = {'a[' + str(v) + ']': k for k, v in self.random_effect_map.items()}
+            if not skip_scaling:
+                self.scales = dict(scales)
+            return dict(pystan_data)
+
+        return self._fit_transform(df, skip_scaling=skip_scaling)
+
+    def _fit_transform(self, df: pd.DataFrame, skip_scaling: bool = False) -> dict:
+        """
+        Create features and scale without modifying `df` beyond adding the created features
         """
         logger.info('Fitting and Transforming Data')
         # Engineer features
         df = self._engineer_features(df)
 
         # Engineer response
-        df['response'] = self.response_creators[self.response](df)
+        response = self.response_creators[self.response](df)
 
         # Filter if necessary
-        df = self.filters[self.response](df).copy()
+        df = self.filters[self.response](df)
 
-        # Specify random_effect and map to integer
-        df['RandomEffect'] = self._define_random_effect(df)
+        # Specify random_effect and subset
+        df = pd.DataFrame(dict(
+            [('RandomEffect', self._define_random_effect(df)), ('response', response.loc[df.index])] +
+            [(feature, df[feature]) for feature in self.features]
+        ))
 
-        # Subset and Sort
-        df = df[['RandomEffect'] + ['response'] + self.features].sort_values('RandomEffect').reset_index(drop=True)
+        # Sort
+        df = df.sort_values('RandomEffect').reset_index(drop=True)
 
         # Drop nas
         df = df.dropna(axis=0).reset_index(drop=True)
@@ -284,10 +401,23 @@ class BaseBettingAid(object):
             'linear': 'vector[N] y',
             'bernoulli_logit': 'int<lower=0,upper=1> y[N]'
         }.get(self.response_distributions[self.response])
-        variables = ' '.join(['vector[N] {};'.format(feature) for feature in self.features])
-        parameters = ' '.join(['real b{};'.format(fdx) for fdx in range(len(self.features))])
-        transformation = ' '.join(['+ {}[i] * b{}'.format(feature, fdx) for fdx, feature in enumerate(self.features)])
-        model = ' '.join(['b{} ~ normal(0, 1);'.format(fdx) for fdx in range(len(self.features))])
+        if self.vectorized:
+            # Features are packed into a single design matrix (see `_pack_features`)
+            variables = 'int<lower=0> K; matrix[N, K] X;'
+            parameters = 'vector[K] b;'
+            transformation = 'y_hat = a[RandomEffect] + X * b;'
+            model = 'b ~ normal(0, 1);'
+        else:
+            variables = ' '.join(['vector[N] {};'.format(feature) for feature in self.features])
+            parameters = ' '.join(['real b{};'.format(fdx) for fdx in range(len(self.features))])
+            transformation = 'for (i in 1:N) y_hat[i] = a[RandomEffect[i]] {};'.format(
+                ' '.join(['+ {}[i] * b{}'.format(feature, fdx) for fdx, feature in enumerate(self.features)])
+            )
+            model = ' '.join(['b{} ~ normal(0, 1);'.format(fdx) for fdx in range(len(self.features))])
+        # Fitted values are either saved with every draw or local to the model block (not saved)
+        fitted = 'vector[N] y_hat; {}'.format(transformation)
+        transformed_parameters = 'transformed parameters {{ {} }}'.format(fitted) if self.store_fitted else ''
+        model_fitted = '' if self.store_fitted else fitted
         model_code = """
         data {{
             int<lower=0> J; int<lower=0> N; int<lower=1, upper=J> RandomEffect[N]; {response_var};
@@ -297,49 +427,258 @@ class BaseBettingAid(object):
             vector[J] a; real mu_a; real<lower=0,upper=100> sigma_a; real<lower=0,upper=100> sigma_y;
             {parameters}
         }}
-        transformed parameters {{
-            vector[N] y_hat;
-            for (i in 1:N)
-                y_hat[i] = a[RandomEffect[i]] {transformation};
-        }}
+        {transformed_parameters}
         model {{
+            {model_fitted}
             sigma_a ~ uniform(0, 100); a ~ normal(mu_a, sigma_a); sigma_y ~ uniform(0, 100); {response};
             {model}
         }}
-        """.format(response_var=response_var, variables=variables, parameters=parameters, transformation=transformation,
-                   response=response, model=model)
+        """.format(response_var=response_var, variables=variables, parameters=parameters,
+                   transformed_parameters=transformed_parameters, model_fitted=model_fitted, response=response,
+                   model=model)
 
         return model_code
 
-    def fit(self, df: pd.DataFrame = None) -> pystan.stan:
+    def _pack_features(self, pystan_data: dict) -> dict:
+        """
+        Pack the feature vectors of `fit_transform` into the design matrix expected by the vectorized model
         """
-        Fit a pystan model
+        if not self.vectorized:
+            return pystan_data
+        packed = {k: v for k, v in pystan_data.items() if k not in self.features}
+        packed['K'] = len(self.features)
+        packed['X'] = np.column_stack([pystan_data[feature] for feature in self.features]).astype(float)
+        return packed
+
+    @staticmethod
+    def _normalize_labels(labels: list) -> list:
         """
-        logger.info('Fitting a pystan Model')
+        Name coefficients of the vectorized model (b[1], b[2], ...) like the scalar model (b0, b1, ...) so summaries
+        have the same layout either way
+        """
+        return [re.sub(r'^b\[([0-9]+)\]$', lambda m: 'b{}'.format(int(m.group(1)) - 1), label) for label in labels]
+
+    def _compile_model(self, model_code: str):
+        """
+        Compile model code into a StanModel, re-using a previously compiled model from the cache when possible
+        """
+        # Only fitting needs stan; predictors and artifacts are used without it
+        import pystan
+
+        model_name = '{}_{}_{}'.format(self.feature_label, self.random_effect, self.response)
+        if not self.cache_models:
+            return pystan.StanModel(model_code=model_code, model_name=model_name)
+
+        # Compiled modules are only valid for the same stan version and toolchain
+        key = self.model_cache.make_key(model_code, pystan.__version__, platform.platform(),
+                                        platform.python_version(), sysconfig.get_config_var('CC'))
+        model = self.model_cache.get(key)
+        if model is not None:
+            logger.info('Loaded compiled model from cache')
+            return model
+
+        model = pystan.StanModel(model_code=model_code, model_name=model_name)
+        self.model_cache.put(key, model)
+
+        return model
+
+    def _parameter_names(self) -> list:
+        """
+        Names of the parameters (not transformed parameters) in the model code
+        """
+        coefficients = ['b'] if self.vectorized else ['b{}'.format(fdx) for fdx in range(len(self.features))]
+        return ['a', 'mu_a', 'sigma_a', 'sigma_y'] + coefficients
+
+    def _summarize(self, labels: list, draws: np.ndarray, pystan_data: dict, means: np.ndarray = None) \
+            -> pd.DataFrame:
+        """
+        Summarize approximate posterior draws of the parameters and the fitted values they imply
+        """
+        labels = self._normalize_labels(labels)
+        summary = summarize_draws(labels, draws, means)
+        if not self.store_fitted:
+            return summary
+        a_draws = draws[:, [labels.index('a[{}]'.format(j + 1)) for j in range(pystan_data['J'])]]
+        b_draws = draws[:, [labels.index('b{}'.format(fdx)) for fdx in range(len(self.features))]]
+        x = np.column_stack([pystan_data[feature] for feature in self.features])
+        fitted = summarize_fitted(a_draws, b_draws, pystan_data['RandomEffect'], x)
+
+        return pd.concat([summary, fitted], sort=False).reset_index(drop=True)
+
+    def _fit_advi(self, input_data: dict, pystan_data: dict) -> pd.DataFrame:
+        """
+        Approximate the posterior with ADVI
+        """
+        results = self.model.vb(data=input_data, pars=self._parameter_names(), output_samples=self.iterations,
+                                seed=187, verbose=self.verbose)
+        labels = list(results['sampler_param_names'])
+        draws = np.column_stack(results['sampler_params'])
+        keep = [idx for idx, label in enumerate(labels) if label != 'lp__']
+
+        return self._summarize([labels[idx] for idx in keep], draws[:, keep], pystan_data)
+
+    def _fit_map(self, input_data: dict, pystan_data: dict) -> pd.DataFrame:
+        """
+        Find the posterior mode and approximate standard deviations with a laplace approximation around it. The joint
+        mode of a hierarchical model degenerates as sigma_a -> 0 (the density of a, a[j] ~ normal(mu_a, sigma_a),
+        grows without bound), so with few observations per random effect expect shrunken intercepts and sigma_a near
+        zero; use nuts or advi there.
+        """
+        mode = self.model.optimizing(data=input_data, seed=187, verbose=self.verbose)
+        mode = {name: mode[name] for name in self._parameter_names()}
+
+        # A fit on the same data exposes the log-density gradient and the (un)constraining transforms
+        fit = self.model.sampling(data=input_data, iter=1, chains=1, algorithm='Fixed_param', init=[mode], seed=187)
+        udraws = laplace_draws(fit, np.asarray(fit.unconstrain_pars(mode)), n_draws=self.iterations)
+        draws = []
+        for upars in udraws:
+            constrained = split_pars(fit, fit.constrain_pars(upars))
+            draws.append(flatten_pars({name: constrained[name] for name in self._parameter_names()})[1])
+        labels, means = flatten_pars(mode)
+
+        return self._summarize(labels, np.array(draws), pystan_data, means=means)
+
+    def _sample(self, input_data: dict):
+        """
+        Sample with NUTS. With `reuse_adaptation`, start from the step size and metric of a previous fit with the same
+        parameter layout (random effect, feature set and response distribution, so the linear responses share one) and
+        keep them fixed through a shortened warmup with the same number of draws kept.
+        """
+        # Every response declares the same parameters (a Win's sigma_y only has its prior), the distribution sets scales
+        key = self.adaptation_cache.make_key(type(self).__name__, self.random_effect, self.poll, self.feature_label,
+                                             self.response_distributions[self.response], self.vectorized,
+                                             input_data['J'])
+        adaptation = self.adaptation_cache.get(key) if self.reuse_adaptation else None
+        kwargs = {'iter': self.iterations}
+        if adaptation is not None:
+            logger.info('Re-using adaptation from a previous fit, shortening warmup')
+            warmup = max(self.iterations // 10, 50)
+            # Stan's windowed adaptation always ends a window in warmup and re-estimates the metric from its few draws,
+            # so adaptation is turned off and the shortened warmup only moves the chains into the posterior
+            kwargs = {
+                'warmup': warmup,
+                'iter': warmup + self.iterations - self.iterations // 2,
+                'control': {'adapt_engaged': False, 'stepsize': adaptation['stepsize'],
+                            'inv_metric': adaptation['inv_metric']}
+            }
+            # Final draws of another response sit elsewhere in the posterior, so only this response's are reused
+            inits = adaptation['inits'].get(self.response)
+            if inits is not None:
+                kwargs['init'] = [inits[chain % len(inits)] for chain in range(self.chains)]
+        fit = self.model.sampling(data=input_data, chains=self.chains, n_jobs=self.n_jobs, verbose=self.verbose,
+                                  seed=187, **kwargs)
+
+        if self.reuse_adaptation:
+            # A fit that adapted replaces the entry's step size and metric, a reused one only adds its final draws
+            if adaptation is None:
+                adaptation = {'stepsize': float(np.mean(fit.get_stepsize())),
+                              'inv_metric': np.mean(fit.get_inv_metric(), axis=0), 'inits': {}}
+            adaptation['inits'][self.response] = [{name: position[name] for name in self._parameter_names()}
+                                                  for position in fit.get_last_position()]
+            self.adaptation_cache.put(key, adaptation)
+
+        return fit
+
+    def fit(self, df: pd.DataFrame = None, inference: str = None) -> tuple:
+        """
+        Fit a pystan model by sampling with NUTS ('nuts'), variational inference ('advi'), or the posterior mode with a
+        laplace approximation ('map'); or fit a linear response with REML in numpy ('reml'). Each produces a summary
+        with the same labels / mean / sd layout.
+        """
+        self.inference = self.inference if inference is None else inference
+        if self.inference not in self.inference_modes:
+            raise ValueError('inference must be in {}'.format(self.inference_modes))
+        if (self.inference == 'reml') and (self.response_distributions[self.response] != 'linear'):
+            raise ValueError('reml only fits linear responses, {} is {}'.format(
+                self.response, self.response_distributions[self.response]))
+        logger.info('Fitting a {} Model'.format(self.inference))
+        start = time.time()
         if df is None:
             df = self.etl()
-        input_data = self.fit_transform(df)
+        pystan_data = self.fit_transform(df)
+        self.fit_metadata = {'inference': self.inference, 'iterations': self.iterations, 'chains': self.chains,
+                             'N': int(pystan_data['N']), 'J': int(pystan_data['J']),
+                             'fit_at': str(pd.Timestamp.now())}
+        if self.inference == 'reml':
+            self.model = None
+            self.summary = fit_random_intercept(pystan_data, self.features, fitted=self.store_fitted)
+            self.fit_metadata['fit_seconds'] = time.time() - start
+            return self.model, self.summary
+
+        input_data = self._pack_features(pystan_data)
         model_code = self.model_code()
 
         # Fit stan model
-        self.model = pystan.StanModel(model_code=model_code, model_name='{}_{}_{}'.format(self.feature_label,
-                                                                                          self.random_effect,
-                                                                                          self.response))
-        fit = self.model.sampling(data=input_data, iter=self.iterations, chains=self.chains, verbose=self.verbose,
-                                  seed=187)
-
-        # Get model summary
-        logger.info('Getting model summary for diagnostics')
-        summary = fit.summary()
-        self.summary = pd.DataFrame(summary['summary'], columns=summary['summary_colnames']). \
-            assign(labels=summary['summary_rownames'])
+        self.model = self._compile_model(model_code)
+        if self.inference == 'advi':
+            self.summary = self._fit_advi(input_data, pystan_data)
+        elif self.inference == 'map':
+            self.summary = self._fit_map(input_data, pystan_data)
+        else:
+            fit = self._sample(input_data)
+
+            # Get model summary
+            logger.info('Getting model summary for diagnostics')
+            summary = fit.summary()
+            self.summary = pd.DataFrame(summary['summary'], columns=summary['summary_colnames']). \
+                assign(labels=self._normalize_labels(summary['summary_rownames']))
+        self.fit_metadata['fit_seconds'] = time.time() - start
 
         return self.model, self.summary
 
-    def save(self, save_path: str = None):
+    def fitted_values(self, pystan_data: dict, sd: bool = False):
+        """
+        Posterior means of y_hat for the output of `fit_transform` (and their sds with `sd`); computed from the
+        parameters when y_hat wasn't stored with the fit, with sds that treat the parameters as independent
+        """
+        if self.summary is None:
+            raise ValueError('Fit a model first.')
+        fitted = self.summary[self.summary['labels'].str.contains('y_hat')]
+        if fitted.shape[0] > 0:
+            return (fitted['mean'].values, fitted['sd'].values) if sd else fitted['mean'].values
+
+        parameters = self.summary.set_index('labels')
+        intercepts = parameters.loc[['a[{}]'.format(j + 1) for j in range(pystan_data['J'])]]
+        coefficients = parameters.loc[['b{}'.format(fdx) for fdx in range(len(self.features))]]
+        x = np.column_stack([pystan_data[feature] for feature in self.features])
+        group = np.asarray(pystan_data['RandomEffect']) - 1
+
+        means = intercepts['mean'].values[group] + x.dot(coefficients['mean'].values)
+        if not sd:
+            return means
+        return means, np.sqrt(intercepts['sd'].values[group] ** 2 + (x ** 2).dot(coefficients['sd'].values ** 2))
+
+    def __getstate__(self) -> dict:
+        # Don't pickle the shared dataset with the aid
+        state = self.__dict__.copy()
+        state['dataset'] = None
+        return state
+
+    @classmethod
+    def from_artifact(cls, artifact: FitArtifact, **kwargs) -> 'BaseBettingAid':
         """
-        Save object
+        A betting aid with the fit of an artifact (parameters, scales, and random effect map) but no stan model or
+        stored fitted values, e.g. for models saved with `artifact_only`
         """
+        aid = cls(version=artifact.metadata.get('version', Config.sb_version), random_effect=artifact.random_effect,
+                  features=artifact.feature_label, response=artifact.response, **kwargs)
+        aid.scales = dict(artifact.scales)
+        aid.random_effect_map = dict(artifact.random_effect_map)
+        aid.random_effect_inv = artifact.random_effect_inv
+        aid.summary = artifact.parameters.copy()
+        aid.fit_metadata = dict(artifact.metadata)
+        aid.inference = aid.fit_metadata.get('inference', aid.inference)
+        return aid
+
+    def save(self, save_path: str = None, artifact_only: bool = False):
+        """
+        Save the compact artifact used to generate predictor sets and, unless `artifact_only`, the pickled object
+        """
+        logger.info('Saving artifact to {}'.format(artifact_name(self.version)))
+        FitArtifact.from_aid(self).save(os.path.join(self.results_dir, artifact_name(self.version)))
+        if artifact_only:
+            return
+
         if save_path is None:
             save_path = 'aid_{}.pkl'.format(self.version)
 
@@ -1,15 +1,36 @@
+import uuid
+
 import dash
 import dash_bootstrap_components as dbc
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.dependencies import Input, Output, State
-import pandas as pd
 
-from sports_bettors.dashboard.params import params, utils
+from sports_bettors.dashboard.params import params, utils, team_opts
 from sports_bettors.dashboard.callbacks import ConfigCallbacks, DataCallbacks, PlotCallbacks
+from sports_bettors.dashboard import clientside
+from sports_bettors.dashboard.utils.history import load_index
+from sports_bettors.dashboard.utils.cube import load_cube
+from sports_bettors.registry import registry
+
 
+from config import Config, logger
 
-from config import Config
+
+def warmup(leagues: list = None):
+    """
+    Load the dashboard's read-only data ahead of the first request: predictor sets, team and history indexes and
+    results cubes. Called before a preforking server forks, workers share it rather than each loading a copy.
+    """
+    leagues = [p['value'] for p in params[Config.sb_version]['league-opts']] if leagues is None else leagues
+    registry.warmup(leagues)
+    for league in leagues:
+        team_opts(league)
+        try:
+            load_index(league)
+        except FileNotFoundError:
+            logger.info('WARNING: No curated data for {}, run `sb_curate`'.format(league))
+        load_cube(league)
 
 
 def add_sb_dash(server, routes_pathname_prefix: str = '/api/dash/sportsbettors/'):
@@ -36,7 +57,8 @@ def add_sb_dash(server, routes_pathname_prefix: str = '/api/dash/sportsbettors/'
 
         # History
         html.Div(id='history', children=[
-            html.Div(id='history-data', style=utils['no_show'], children=pd.DataFrame().to_json()),
+            # Key of the frame in the server-side frame store
+            dcc.Store(id='history-data'),
             html.Br(),
             html.H3('Display Historical Match-up Data (if applicable)'),
             dcc.Dropdown(id='history-x', style=utils['no_show']),
@@ -49,9 +71,10 @@ def add_sb_dash(server, routes_pathname_prefix: str = '/api/dash/sportsbettors/'
 
         # Results
         html.Div(id='results', children=[
-            html.Div(id='results-win-data', style=utils['no_show'], children=pd.DataFrame().to_json()),
-            html.Div(id='results-margin-data', style=utils['no_show'], children=pd.DataFrame().to_json()),
-            html.Div(id='results-total-points-data', style=utils['no_show'], children=pd.DataFrame().to_json()),
+            # Key of the win frame in the frame store, margins and total points pivoted for the browser
+            dcc.Store(id='results-win-data'),
+            dcc.Store(id='results-margin-data'),
+            dcc.Store(id='results-total-points-data'),
             html.Br(), html.Br(),
             html.H3('Configure Results'),
             html.P(
@@ -78,6 +101,12 @@ def add_sb_dash(server, routes_pathname_prefix: str = '/api/dash/sportsbettors/'
             dbc.Input(id='parameter-3', style=utils['no_show']),
             dbc.Input(id='parameter-4', style=utils['no_show']),
             dbc.Button('Update Results', id='update-results-data', n_clicks=0, color="primary"),
+            # Results are computed as a job (see `sports_bettors.dashboard.jobs`) that the page polls until it's done
+            dcc.Store(id='session-id'),
+            dcc.Store(id='results-job'),
+            dcc.Interval(id='results-interval', interval=250, disabled=True),
+            dbc.Progress(id='results-progress', value=0, style=utils['no_show']),
+            dbc.Alert(id='results-error', color='danger', is_open=False),
             dcc.Loading(id='win-loading',
                         type='graph',
                         children=[dcc.Graph(id='win-fig', figure=utils['empty_figure'], style=utils['no_show'])]),
@@ -140,7 +169,7 @@ def add_sb_dash(server, routes_pathname_prefix: str = '/api/dash/sportsbettors/'
     # Populate with history
     @dashapp.callback(
         [
-            Output('history-data', 'children'),
+            Output('history-data', 'data'),
             Output('history-x', 'options'),
             Output('history-y', 'options')
         ],
@@ -159,23 +188,20 @@ def add_sb_dash(server, routes_pathname_prefix: str = '/api/dash/sportsbettors/'
             Output('history-y', 'style')
          ],
         [
-            Input('history-data', 'children'),
+            Input('history-data', 'data'),
             Input('history-x', 'value'),
             Input('history-y', 'value')
         ]
     )
-    def history_figures(df, x, y):
-        return PlotCallbacks.history(df, x, y)
+    def history_figures(key, x, y):
+        return PlotCallbacks.history(key, x, y)
 
-    # Populate with results
+    # Queue results
     @dashapp.callback(
-        [
-            Output('results-win-data', 'children'),
-            Output('results-margin-data', 'children'),
-            Output('results-total-points-data', 'children')
-        ],
+        [Output('results-job', 'data'), Output('session-id', 'data')],
         [Input('update-results-data', 'n_clicks')],
         [
+            State('session-id', 'data'),
             State('league', 'value'),
             State('feature-sets', 'value'),
             State('team', 'value'),
@@ -191,33 +217,49 @@ def add_sb_dash(server, routes_pathname_prefix: str = '/api/dash/sportsbettors/'
             State('parameter-4', 'value')
         ]
     )
-    def results_data(trigger, league, feature_set, team, opponent, variable, *parameters):
-        return DataCallbacks.results(league, feature_set, team, opponent, variable, *parameters)
+    def results_job(trigger, session, league, feature_set, team, opponent, variable, *parameters):
+        # A page's jobs share a session so a new click supersedes the previous one
+        session = uuid.uuid4().hex if session is None else session
+        job = DataCallbacks.submit_results(session, league, feature_set, team, opponent, variable, *parameters)
+        return job, session
+
+    # Populate with results once the job is done
+    @dashapp.callback(
+        [
+            Output('results-win-data', 'data'),
+            Output('results-margin-data', 'data'),
+            Output('results-total-points-data', 'data'),
+            Output('results-progress', 'value'),
+            Output('results-progress', 'style'),
+            Output('results-interval', 'disabled'),
+            Output('results-error', 'children'),
+            Output('results-error', 'is_open')
+        ],
+        [Input('results-job', 'data'), Input('results-interval', 'n_intervals')]
+    )
+    def results_data(job, n_intervals):
+        return DataCallbacks.poll_results(job)
 
     # Win figure
     @dashapp.callback(
         [Output('win-fig', 'figure'), Output('win-fig', 'style')],
-        [Input('results-win-data', 'children')],
+        [Input('results-win-data', 'data')],
         [State('variable', 'value')]
     )
-    def win_figure(df, variable):
-        return PlotCallbacks.win_figure(df, variable)
+    def win_figure(key, variable):
+        return PlotCallbacks.win_figure(key, variable)
 
-    # margin figure
-    @dashapp.callback(
+    # Margin and total points figures follow the hover on the win figure in the browser, without a request
+    dashapp.clientside_callback(
+        clientside.response_figure,
         [Output('margin-fig', 'figure'), Output('margin-fig', 'style')],
-        [Input('results-margin-data', 'children'), Input('win-fig', 'hoverData')]
+        [Input('results-margin-data', 'data'), Input('win-fig', 'hoverData')]
     )
-    def conditioned_margin_figure(df, variable_val):
-        return PlotCallbacks.conditioned_margin_figure(df, variable_val)
-
-    # Total Points figure
-    @dashapp.callback(
+    dashapp.clientside_callback(
+        clientside.response_figure,
         [Output('total-points-fig', 'figure'), Output('total-points-fig', 'style')],
-        [Input('results-total-points-data', 'children'), Input('win-fig', 'hoverData')]
+        [Input('results-total-points-data', 'data'), Input('win-fig', 'hoverData')]
     )
-    def total_points_figure(df, variable_val):
-        return PlotCallbacks.total_points_figure(df, variable_val)
 
     return dashapp.server
 
@@ -1,9 +1,13 @@
-import pandas as pd
+import dash
 import plotly.express as px
 
-from sports_bettors.dashboard.params import params, utils
+from sports_bettors.dashboard.params import params, utils, team_opts
 from sports_bettors.dashboard.utils.history import populate as history_populate
-from sports_bettors.dashboard.utils.results import ResultsPopulator
+from sports_bettors.dashboard.utils.results import ResultsPopulator, results_cache, default_parameters
+from sports_bettors.dashboard.utils.frames import put_frame, get_frame
+from sports_bettors.dashboard.clientside import pivot
+from sports_bettors.dashboard.jobs import jobs
+from sports_bettors.registry import registry
 
 from config import Config
 
@@ -17,9 +21,9 @@ class ConfigCallbacks(object):
         """
         Populate dropdowns
         """
-        team_opts = params[Config.sb_version]['team-opts'][league]
+        teams = team_opts(league)
         feature_set_opts = params[Config.sb_version]['feature-sets-opts'][league]
-        return team_opts, utils['show'], team_opts, utils['show'], feature_set_opts, utils['show']
+        return teams, utils['show'], teams, utils['show'], feature_set_opts, utils['show']
 
     @staticmethod
     def variables(league: str, feature_set: str):
@@ -56,46 +60,90 @@ class DataCallbacks(object):
     @staticmethod
     def history(league: str, team: str, opponent: str):
         """
-        Load data for historical matchups
+        Load data for historical matchups, handing the figure its key in the frame store
         """
         df, x_opts, y_opts = history_populate(league, team, opponent)
-        return df.to_json(), x_opts, y_opts
+        return put_frame(df), x_opts, y_opts
 
     @staticmethod
-    def results(league: str, feature_set: str, team: str, opponent: str, variable: str, *parameters):
+    def submit_results(session: str, league: str, feature_set: str, team: str, opponent: str, variable: str,
+                       *parameters) -> str:
         """
-        Calculate probabilities
+        Queue the results of a query as the session's job, superseding its previous one, and return the job's id
         """
         if not all([league, feature_set, team, opponent, variable]):
-            return pd.DataFrame().to_json(), pd.DataFrame().to_json(), pd.DataFrame().to_json()
+            return None
+        return jobs.submit(session, DataCallbacks.results, league, feature_set, team, opponent, variable, *parameters)
 
-        # Drop nones in parameters
-        parameters = [p for p in parameters if p]
+    @staticmethod
+    def poll_results(job: str):
+        """
+        Outputs of a finished results job, otherwise its progress (a percentage) and whether to keep polling, followed
+        by the error shown on the page and whether to show it
+        """
+        status = jobs.status(job)
+        if status['status'] == 'done':
+            return tuple(status['result']) + (100, utils['no_show'], True, None, False)
+        if status['status'] in ['queued', 'running']:
+            return (dash.no_update,) * 3 + (int(100 * status['progress']), utils['show'], False, None, False)
+        # No job yet, or a failed, cancelled or expired one
+        if (job is None) or (status['status'] == 'cancelled'):
+            error = None
+        elif status['status'] == 'failed':
+            error = 'Results failed: {}'.format(status['error'])
+        else:
+            error = 'Results expired before they were shown, update them again'
+        return None, None, None, 0, utils['no_show'], True, error, error is not None
+
+    @staticmethod
+    def results(league: str, feature_set: str, team: str, opponent: str, variable: str, *parameters, report=None):
+        """
+        Calculate probabilities, returning the key of the win frame in the frame store and the margins and total points
+        pivoted for the figures drawn in the browser. `report(progress)` is called between steps when run as a job.
+        """
+        report = (lambda progress: None) if report is None else report
+        if not all([league, feature_set, team, opponent, variable]):
+            return None, None, None
 
-        # Convert to dictionary
+        # Convert (label, value) pairs to a dictionary, dropping hidden and blank inputs but keeping zeros
         def _parse_parameters(p):
-            p = {k: v for k, v in zip(p[::2], p[1::2])} if len(p) > 1 else {}
+            p = {k: v for k, v in zip(p[::2], p[1::2]) if (k is not None) and (v is not None) and (v != '')}
             # Convert keys, values
             p = {utils['feature_maps'][Config.sb_version][league][k]: int(v) for k, v in p.items()}
             return p
-        parameters = _parse_parameters(parameters)
-
-        # Results
-        populator = ResultsPopulator(
-            league=league,
-            feature_set=feature_set,
-            team=team,
-            opponent=opponent,
-            variable=variable,
-            parameters=parameters
-        )
-
-        # Win probabilities
-        df_win = populator.win()
-        df_margins = populator.margins()
-        df_points = populator.total_points()
-
-        return df_win.to_json(), df_margins.to_json(), df_points.to_json()
+        # Inputs left blank take their training mean
+        parameters = dict(default_parameters(league, feature_set, variable), **_parse_parameters(parameters))
+
+        # Repeated queries are served from the cache until the predictor set is regenerated
+        key = results_cache.make_key(league, feature_set, team, opponent, variable, sorted(parameters.items()),
+                                     registry.token(league))
+        outputs = results_cache.get(key)
+        if outputs is None:
+            # Results
+            populator = ResultsPopulator(
+                league=league,
+                feature_set=feature_set,
+                team=team,
+                opponent=opponent,
+                variable=variable,
+                parameters=parameters
+            )
+
+            # Win probabilities
+            df_win = populator.win()
+            report(1 / 3)
+            df_margins = populator.margins()
+            report(2 / 3)
+            df_points = populator.total_points()
+            report(1.)
+
+            outputs = df_win, df_margins, df_points
+            results_cache.put(key, outputs)
+
+        df_win, df_margins, df_points = outputs
+        return put_frame(df_win, key='{}_win'.format(key)), \
+            pivot(df_margins, 'Margin', 'Margins / Spreads', color='Result'), \
+            pivot(df_points, 'TotalPoints', 'Total Points in Matchup')
 
 
 class PlotCallbacks(object):
@@ -103,11 +151,11 @@ class PlotCallbacks(object):
     Generate plotly figures from history and results
     """
     @staticmethod
-    def history(df, x: str, y: str):
+    def history(key: str, x: str, y: str):
         """
         Plot historical data
         """
-        df = pd.read_json(df, orient='records')
+        df = get_frame(key)
         if df.shape[0] == 0:
             return utils['empty_figure'], utils['show'], utils['show'], utils['show']
         x = df.columns[0] if not x else x
@@ -117,11 +165,11 @@ class PlotCallbacks(object):
         return fig, utils['show'], utils['show'], utils['show']
 
     @staticmethod
-    def win_figure(df, variable: str):
+    def win_figure(key: str, variable: str):
         """
         Plot results
         """
-        df = pd.read_json(df, orient='records')
+        df = get_frame(key)
         if df.shape[0] == 0:
             return utils['empty_figure'], utils['no_show']
         else:
@@ -131,41 +179,3 @@ class PlotCallbacks(object):
                           title='Win Probability')
             fig.update_layout(xaxis_showgrid=True, yaxis_showgrid=True)
             return fig, utils['show']
-
-    @staticmethod
-    def conditioned_margin_figure(df, variable_val):
-        """
-        Plot conditioned results for margins
-        """
-        df = pd.read_json(df)
-        if df.shape[0] == 0:
-            return utils['empty_figure'], utils['no_show']
-        else:
-            if variable_val is None:
-                return utils['empty_figure'], utils['no_show']
-            # Win margin figure
-            variable_val = variable_val['points'][0]['x']
-            df = df[df['variable_val'] == variable_val].sort_values('Margin')
-            fig = px.line(df, x='Margin', y='Probability', error_y='Probability_UB', error_y_minus='Probability_LB',
-                          color='Result', template='plotly_dark', title='Margins / Spreads')
-            fig.update_layout(xaxis_showgrid=True, yaxis_showgrid=True)
-            return fig, utils['show']
-
-    @staticmethod
-    def total_points_figure(df, variable_val):
-        """
-        Total points figure
-        """
-        df = pd.read_json(df)
-        if df.shape[0] == 0:
-            return utils['empty_figure'], utils['no_show']
-        else:
-            if variable_val is None:
-                return utils['empty_figure'], utils['no_show']
-            # Total Points figure
-            variable_val = variable_val['points'][0]['x']
-            df = df[df['variable_val'] == variable_val].sort_values('TotalPoints')
-            fig = px.line(df, x='TotalPoints', y='Probability', error_y='Probability_UB',
-                          error_y_minus='Probability_LB', template='plotly_dark', title='Total Points in Matchup')
-            fig.update_layout(xaxis_showgrid=True, yaxis_showgrid=True)
-            return fig, utils['show']
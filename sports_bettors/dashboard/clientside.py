@@ -0,0 +1,62 @@
+import json
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from sports_bettors.dashboard.params import utils
+
+
+def pivot(df: pd.DataFrame, x: str, title: str, color: str = None) -> dict:
+    """
+    Pivot a results frame for `response_figure`: a trace per `color` with its probabilities and their bounds as
+    [variable_val x `x`] arrays, and the figure's layout. Sent to the browser once per update of the results.
+    """
+    if df.shape[0] == 0:
+        return None
+    variable_vals = sorted(df['variable_val'].unique().tolist())
+    groups = df.groupby(color, sort=False) if color is not None else [(None, df)]
+    traces = []
+    for name, df_group in groups:
+        trace = {'name': name}
+        for key, column in [('y', 'Probability'), ('lb', 'Probability_LB'), ('ub', 'Probability_UB')]:
+            values = df_group.pivot(index='variable_val', columns=x, values=column).reindex(variable_vals).round(4)
+            trace['x'] = values.columns.tolist()
+            # Json has no NaN
+            trace[key] = values.astype(object).where(values.notnull(), None).values.tolist()
+        traces.append(trace)
+    layout = go.Figure(layout={
+        'template': 'plotly_dark',
+        'title': {'text': title},
+        'xaxis': {'title': {'text': x}, 'showgrid': True},
+        'yaxis': {'title': {'text': 'Probability'}, 'showgrid': True},
+        'legend': {'title': {'text': color}},
+        'showlegend': color is not None
+    }).to_plotly_json()['layout']
+
+    return {'variable_vals': variable_vals, 'traces': traces, 'layout': layout}
+
+
+# Draws a pivoted response (see `pivot`) at the variable value hovered on the win figure, in the browser
+response_figure = """
+function(data, hoverData) {
+    var empty = %s, show = %s, noShow = %s;
+    if (!data || !hoverData) {
+        return [empty, noShow];
+    }
+    var idx = data.variable_vals.indexOf(hoverData.points[0].x);
+    if (idx < 0) {
+        return [empty, noShow];
+    }
+    var traces = data.traces.map(function(trace) {
+        return {
+            type: 'scatter',
+            mode: 'lines',
+            name: trace.name,
+            x: trace.x,
+            y: trace.y[idx],
+            error_y: {type: 'data', array: trace.ub[idx], arrayminus: trace.lb[idx]}
+        };
+    });
+    return [{data: traces, layout: data.layout}, show];
+}
+""" % (json.dumps(utils['empty_figure']), json.dumps(utils['show']), json.dumps(utils['no_show']))
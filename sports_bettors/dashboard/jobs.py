@@ -0,0 +1,95 @@
+import os
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sports_bettors.utils.cache import DiskCache, MemoryCache
+
+from config import Config, logger
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobQueue(object):
+    """
+    Runs dashboard jobs on a pool of `workers` threads so callbacks return immediately and the page polls for the
+    result. Status ({status, progress, result, error}) is kept in `store`, a DiskCache when callbacks from a page may
+    land on different processes. A session runs one job at a time: submitting another supersedes the previous one,
+    which is dropped if it hasn't started, stops at its next progress report if it's running, and is marked cancelled
+    rather than done if it finishes in between.
+    """
+    def __init__(self, store, workers: int = 2):
+        self.store = store
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Created on first use so the threads belong to the process serving requests, not a parent that forked it
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sb-dashboard-job')
+            return self._executor
+
+    @staticmethod
+    def _session_key(session: str) -> str:
+        return 'session_{}'.format(session)
+
+    def _set(self, job: str, status: str, progress: float = 0., result=None, error: str = None):
+        self.store.put('job_{}'.format(job), {'status': status, 'progress': progress, 'result': result, 'error': error})
+
+    def superseded(self, session: str, job: str) -> bool:
+        """
+        Whether the session has submitted a newer job. A session whose marker was evicted from the store has nothing
+        newer (submitting writes a new marker), so its job carries on.
+        """
+        current = self.store.get(self._session_key(session))
+        return (current is not None) and (current != job)
+
+    def submit(self, session: str, fn, *args) -> str:
+        """
+        Queue `fn(*args, report=report)` as the session's job and return its id. `fn` calls `report(progress)` (0 to 1)
+        as it goes, which raises JobCancelled once the job is superseded.
+        """
+        job = uuid.uuid4().hex
+        self.store.put(self._session_key(session), job)
+        self._set(job, 'queued')
+        self._pool().submit(self._run, session, job, fn, args)
+        return job
+
+    def status(self, job: str) -> dict:
+        """
+        {status: queued | running | done | cancelled | failed | missing, progress, result, error} of a job
+        """
+        status = self.store.get('job_{}'.format(job)) if job else None
+        return {'status': 'missing', 'progress': 0., 'result': None, 'error': None} if status is None else status
+
+    def _run(self, session: str, job: str, fn, args: tuple):
+        def report(progress: float):
+            if self.superseded(session, job):
+                raise JobCancelled(job)
+            self._set(job, 'running', progress=progress)
+
+        try:
+            report(0.)
+            result = fn(*args, report=report)
+            # Jobs that never report (e.g. served from a cache) are checked once more before their result is stored
+            report(1.)
+        except JobCancelled:
+            self._set(job, 'cancelled')
+            return
+        except Exception as err:
+            logger.info('Dashboard job {} failed: {}'.format(job, err))
+            self._set(job, 'failed', error=str(err))
+            return
+        self._set(job, 'done', progress=1., result=result)
+
+
+# Results callbacks run here; their status is shared like the frames they produce
+jobs = JobQueue(
+    MemoryCache(Config.FRAME_STORE_BYTES, ttl=Config.FRAME_STORE_TTL) if Config.FRAME_STORE == 'memory' else
+    DiskCache(os.path.join(Config.CACHE_DIR, 'jobs'), Config.FRAME_STORE_BYTES, ttl=Config.FRAME_STORE_TTL),
+    workers=Config.RESULTS_WORKERS
+)
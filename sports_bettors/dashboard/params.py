@@ -1,12 +1,6 @@
-import os
-import pandas as pd
+from sports_bettors.utils.store import read_teams
 
-from config import Config
-
-college_teams = set(pd.read_csv(os.path.join(Config.DATA_DIR, 'sports_bettors', 'curated', 'college_football',
-                                             'df_curated.csv'))['team'])
-nfl_teams = set(pd.read_csv(os.path.join(Config.DATA_DIR, 'sports_bettors', 'curated', 'nfl',
-                                         'df_curated.csv'))['team'])
+from config import logger
 
 utils = {
     'empty_figure': {
@@ -55,44 +49,6 @@ utils = {
                 'Points Scored': 'total_points',
             }
         }
-    },
-    'feature_creators': {
-        'v2': {
-            'college_football': {
-                'RushOnly': {
-                    'rush_yds_x_atms': lambda p: p['rushingYards'] * p['rushingAttempts']
-                },
-                'PassOnly': {
-                    'pass_yds_x_atms': lambda p: p['netPassingYards'] * p['passAttempts']
-                },
-                'Offense': {
-                    'rush_yds_x_atms': lambda p: p['rushingYards'] * p['rushingAttempts'],
-                    'pass_yds_x_atms': lambda p: p['netPassingYards'] * p['passAttempts'],
-                    'rush_yds_x_pass_yds': lambda p: p['rushingYards'] * p['netPassingYards']
-                },
-                'OffenseAdv': {
-                    'rush_yds_adv_x_pass_yds_adv': lambda p: p['rush_yds_adv'] * p['pass_yds_adv']
-                },
-                'PointsScored': {}
-            },
-            'nfl': {
-                'RushOnly': {
-                    'rush_yds_x_atms': lambda p: p['rushYards'] * p['rushAttempts']
-                },
-                'PassOnly': {
-                    'pass_yds_x_atms': lambda p: p['NetPassYards'] * p['passAttempts']
-                },
-                'Offense': {
-                    'rush_yds_x_atms': lambda p: p['rushYards'] * p['rushAttempts'],
-                    'pass_yds_x_atms': lambda p: p['NetPassYards'] * p['passAttempts'],
-                    'rush_yds_x_pass_yds': lambda p: p['rushYards'] * p['NetPassYards']
-                },
-                'OffenseAdv': {
-                    'rush_yds_adv_x_pass_yds_adv': lambda p: p['rush_yds_adv'] * p['pass_yds_adv']
-                },
-                'PointsScored': {}
-            }
-        }
     }
 }
 
@@ -102,10 +58,6 @@ params = {
             {'label': 'NFL', 'value': 'nfl'},
             {'label': 'College Football', 'value': 'college_football'}
         ],
-        'team-opts': {
-            'nfl': [{'label': team, 'value': team} for team in nfl_teams],
-            'college_football': [{'label': team, 'value': team} for team in college_teams]
-        },
         'feature-sets-opts': {
             'nfl': [
                 {'label': 'Rushing', 'value': 'RushOnly'},
@@ -210,3 +162,15 @@ params = {
         }
     }
 }
+
+
+def team_opts(league: str) -> list:
+    """
+    Dropdown options for a league's teams, read from the teams index on first use rather than at import
+    """
+    try:
+        teams = read_teams(league)
+    except FileNotFoundError as err:
+        logger.info('No teams for {}: {}'.format(league, err))
+        return []
+    return [{'label': team, 'value': team} for team in teams.keys()]
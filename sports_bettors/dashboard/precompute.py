@@ -0,0 +1,97 @@
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from tqdm import tqdm
+
+from sports_bettors.dashboard.params import params
+from sports_bettors.dashboard.utils.results import ResultsPopulator, default_parameters
+from sports_bettors.dashboard.utils.cube import ResultsCube, cube_path
+from sports_bettors.registry import registry
+
+from config import Config, logger
+
+# Columns of each per-perspective frame kept in the cube, and the keys that order its rows like the dashboard's frames
+probability_columns = ['Probability', 'Probability_LB', 'Probability_UB']
+frame_keys = {'margins': ['variable_val', 'Margin', 'Result'], 'total_points': ['variable_val', 'TotalPoints']}
+
+
+def _team_results(league: str, team: str) -> dict:
+    """
+    Results of one team from both perspectives (as the team and as the opponent) for every feature set and variable
+    """
+    results = {}
+    for feature_set, variable_opts in params[Config.sb_version]['variable-opts'][league].items():
+        for variable in [p['value'] for p in variable_opts]:
+            parameters = default_parameters(league, feature_set, variable)
+            populator = ResultsPopulator(league=league, feature_set=feature_set, team=team, opponent=team,
+                                         variable=variable, parameters=parameters)
+            prefix = '{}.{}.'.format(feature_set, variable)
+            try:
+                for is_opponent, perspective in [(False, 'team'), (True, 'opp')]:
+                    # Win is kept as log-odds, float16 probabilities round to 0 / 1 in the tails
+                    mu, _ = populator._response(is_opponent, 'Win')
+                    results[prefix + 'win.' + perspective] = mu.astype(np.float16)
+                    frames = {'margins': populator._margins(is_opponent),
+                              'total_points': populator._total_points(is_opponent)}
+                    for frame, df in frames.items():
+                        if df.shape[0] == 0:
+                            continue
+                        df = df.sort_values(frame_keys[frame]).reset_index(drop=True)
+                        results[prefix + frame + '.' + perspective] = df[probability_columns].values.astype(np.float16)
+                        for key in frame_keys[frame]:
+                            results[prefix + frame + '.' + key] = np.array(df[key].tolist())
+            except KeyError as err:
+                logger.info('Skipping {} ~ {} for {}, no model for {}'.format(feature_set, variable, league, err))
+                results = {name: values for name, values in results.items() if not name.startswith(prefix)}
+                continue
+            results[prefix + 'variable_vals'] = np.array(list(populator.variable_vals))
+
+    return results
+
+
+def precompute_results(league: str, workers: int = 1):
+    """
+    Build the results cube of a league from its served predictor set, evaluating teams in parallel
+    """
+    token = registry.token(league)
+    compiled = registry.get(league).compiled
+    # Teams in the order of the predictor set, plus a name it hasn't seen for the global intercept row
+    teams = compiled.teams.tolist() + ['']
+    logger.info('Precomputing results for {} teams in {}'.format(len(teams), league))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(tqdm(executor.map(partial(_team_results, league), teams), total=len(teams)))
+
+    arrays = {}
+    for name in results[0].keys():
+        if name.endswith('.team') or name.endswith('.opp'):
+            arrays[name] = np.stack([result[name] for result in results])
+        else:
+            arrays[name] = results[0][name]
+
+    index = {
+        'league': league,
+        'version': Config.sb_version,
+        'token': token,
+        'teams': compiled.teams.tolist(),
+        'parameters': {}
+    }
+    for name in arrays.keys():
+        if name.endswith('.variable_vals'):
+            feature_set, variable = name.split('.')[:2]
+            index['parameters'].setdefault(feature_set, {})[variable] = {
+                feature: float(val) for feature, val in default_parameters(league, feature_set, variable).items()
+            }
+
+    logger.info('Saving results cube for {}'.format(league))
+    ResultsCube.save(cube_path(league), index, arrays)
+
+
+def precompute_results_cli():
+    parser = argparse.ArgumentParser(prog='Precompute dashboard results')
+    parser.add_argument('--league', required=True)
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes evaluating teams')
+    args = parser.parse_args()
+    precompute_results(args.league, workers=args.workers)
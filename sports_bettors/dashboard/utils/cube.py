@@ -0,0 +1,93 @@
+import os
+import json
+
+import numpy as np
+
+from sports_bettors.utils.arrays import save_arrays, load_arrays
+
+from config import Config
+
+schema_version = 1
+
+
+def cube_path(league: str, version: str = Config.sb_version) -> str:
+    # Kept out of the results tree, which `sb_generate_predictors` walks for fit models
+    return os.path.join(Config.CACHE_DIR, 'results_cube', league, version)
+
+
+class ResultsCube(object):
+    """
+    Dashboard results precomputed for every team, feature set and variable at the default parameters (see
+    `sb_precompute_results`). Results are stored per perspective so any team / opponent pair is two slices:
+        {feature_set}.{variable}.variable_vals: [variable]
+        {feature_set}.{variable}.win.{team|opp}: [team x variable x (lb, mean, ub)] win log-odds
+        {feature_set}.{variable}.{margins|total_points}.{team|opp}: [team x row x (Probability, LB, UB)], rows in the
+            order of the dashboard's frames with their keys in {feature_set}.{variable}.{margins|total_points}.{key}
+    The last team row holds teams the predictor set hasn't seen. Arrays are float16 and memory-mapped.
+    """
+    def __init__(self, index: dict, arrays: dict):
+        self.index = index
+        self.arrays = arrays
+        self.teams = np.array(index['teams'], dtype=str)
+
+    def team_id(self, team: str) -> int:
+        idx = int(np.searchsorted(self.teams, team))
+        return idx if (idx < self.teams.shape[0]) and (self.teams[idx] == team) else self.teams.shape[0]
+
+    def matches(self, token: str, feature_set: str, variable: str, parameters: dict) -> bool:
+        """
+        Whether a query can be served from the cube: built from the same predictor set and at the same parameters
+        """
+        defaults = self.index['parameters'].get(feature_set, {}).get(variable)
+        if (token != self.index['token']) or (defaults is None):
+            return False
+        return all([parameters.get(feature) == val for feature, val in defaults.items()])
+
+    def slice(self, team: str, opponent: str, feature_set: str, variable: str) -> dict:
+        """
+        Arrays of a query: the team's perspective from its row, the opponent's from the opponent's row
+        """
+        prefix = '{}.{}.'.format(feature_set, variable)
+        rows = {'team': self.team_id(team), 'opp': self.team_id(opponent)}
+        sliced = {}
+        for name, values in self.arrays.items():
+            if not name.startswith(prefix):
+                continue
+            name = name[len(prefix):]
+            perspective = name.split('.')[-1]
+            sliced[name] = np.asarray(values[rows[perspective]], dtype=float) if perspective in rows else values
+        return sliced
+
+    @staticmethod
+    def save(path: str, index: dict, arrays: dict):
+        """
+        Write the arrays to a new sub-directory and swap in the index naming it last, so readers see a complete cube
+        """
+        save_arrays(path, dict(index, schema_version=schema_version), arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'ResultsCube':
+        with open(os.path.join(path, 'index.json'), 'r') as fp:
+            index = json.load(fp)
+        if index['schema_version'] > schema_version:
+            raise ValueError('Results cube schema {} is newer than supported ({})'.format(
+                index['schema_version'], schema_version))
+        return cls(index, load_arrays(path, index, index['names']))
+
+
+# Cubes loaded in this process, with the mtime of the index they were loaded from
+_cubes = {}
+
+
+def load_cube(league: str, version: str = Config.sb_version) -> ResultsCube:
+    """
+    A league's results cube, reloaded when it is rebuilt; None if it hasn't been built
+    """
+    try:
+        signature = os.stat(os.path.join(cube_path(league, version), 'index.json')).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    key = (league, version)
+    if (key not in _cubes) or (_cubes[key][0] != signature):
+        _cubes[key] = (signature, ResultsCube.load(cube_path(league, version)))
+    return _cubes[key][1]
@@ -0,0 +1,29 @@
+import os
+import uuid
+
+import pandas as pd
+
+from sports_bettors.utils.cache import DiskCache, MemoryCache
+
+from config import Config
+
+# DataFrames shared between dashboard callbacks; the browser only holds their keys
+frame_store = MemoryCache(Config.FRAME_STORE_BYTES, ttl=Config.FRAME_STORE_TTL) if Config.FRAME_STORE == 'memory' \
+    else DiskCache(os.path.join(Config.CACHE_DIR, 'frames'), Config.FRAME_STORE_BYTES, ttl=Config.FRAME_STORE_TTL)
+
+
+def put_frame(df: pd.DataFrame, key: str = None) -> str:
+    """
+    Store a frame for later callbacks and return its key, a new one unless given
+    """
+    key = uuid.uuid4().hex if key is None else key
+    frame_store.put(key, df, size=int(df.memory_usage(deep=True).sum()))
+    return key
+
+
+def get_frame(key: str) -> pd.DataFrame:
+    """
+    A stored frame, empty if there is no key or it has expired
+    """
+    df = frame_store.get(key) if key else None
+    return pd.DataFrame() if df is None else df
@@ -1,22 +1,74 @@
 import os
+import threading
 from typing import Tuple
+import numpy as np
 import pandas as pd
 
-from config import Config
+from sports_bettors.utils.store import read_curated, curated_dir
 
+from config import logger
 
-def populate(league, team, opponent) -> Tuple[pd.DataFrame, list, list]:
-    if league == 'college_football':
-        df = pd.read_csv(os.path.join(Config.DATA_DIR, 'sports_bettors', 'curated', league, 'df_curated.csv'))
-        df['Winner'] = df['team'].where(df['points'] > df['opp_points'], df['opponent'])
-        df = df[(df['team'] == team) & (df['opponent'] == opponent)]
-        options = [{'label': col, 'value': col} for col in df.columns]
-        return df, options, options
-    elif league == 'nfl':
-        df = pd.read_csv(os.path.join(Config.DATA_DIR, 'sports_bettors', 'curated', league, 'df_curated.csv'))
+
+class HistoryIndex(object):
+    """
+    A league's curated data loaded once as compact columns (strings as categoricals, integers downcast), sorted by
+    (team, opponent) with the row range of every matchup, so a lookup is a slice rather than a read of the data
+    """
+    def __init__(self, df: pd.DataFrame):
         df['Winner'] = df['team'].where(df['points'] > df['opp_points'], df['opponent'])
-        df = df[(df['team'] == team) & (df['opponent'] == opponent)]
-        options = [{'label': col, 'value': col} for col in df.columns]
-        return df, options, options
+        df = df.sort_values(['team', 'opponent'], kind='mergesort').reset_index(drop=True)
+        # Rows of each matchup are contiguous after the sort
+        team, opponent = df['team'].values, df['opponent'].values
+        starts = np.flatnonzero(np.r_[True, (team[1:] != team[:-1]) | (opponent[1:] != opponent[:-1])])[:len(team)]
+        stops = np.r_[starts[1:], len(df)]
+        self.ranges = {(team[start], opponent[start]): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+        self.columns = {col: self._compact(df[col]) for col in df.columns}
+        self.options = [{'label': col, 'value': col} for col in self.columns.keys()]
+
+    @staticmethod
+    def _compact(values: pd.Series):
+        if pd.api.types.is_integer_dtype(values):
+            return pd.to_numeric(values, downcast='integer').values
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            return values.values
+        return pd.Categorical(values)
+
+    def lookup(self, team: str, opponent: str) -> pd.DataFrame:
+        start, stop = self.ranges.get((team, opponent), (0, 0))
+        return pd.DataFrame({col: values[start:stop] for col, values in self.columns.items()})
+
+
+# Indexes loaded in this process, with the curated file and mtime they were built from
+_indexes = {}
+_lock = threading.Lock()
+
+
+def _signature(league: str) -> tuple:
+    """
+    The teams index is written after the parquet store when data is curated; older data has only the store or csv
+    """
+    for fn in ['teams.json', 'df_curated.parquet', 'df_curated.csv']:
+        path = os.path.join(curated_dir(league), fn)
+        if os.path.exists(path):
+            return path, os.stat(path).st_mtime_ns
+    raise FileNotFoundError('No curated data, run `sb_curate`')
+
+
+def load_index(league: str) -> HistoryIndex:
+    """
+    A league's history index, rebuilt when the data is curated again
+    """
+    signature = _signature(league)
+    with _lock:
+        if (league not in _indexes) or (_indexes[league][0] != signature):
+            logger.info('Indexing history for {}'.format(league))
+            _indexes[league] = (signature, HistoryIndex(read_curated(league)))
+        return _indexes[league][1]
+
+
+def populate(league, team, opponent) -> Tuple[pd.DataFrame, list, list]:
+    if league in ['college_football', 'nfl']:
+        index = load_index(league)
+        return index.lookup(team, opponent), index.options, index.options
     else:
         return pd.DataFrame(), [], []
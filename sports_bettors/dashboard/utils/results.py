@@ -1,15 +1,49 @@
+import os
+
+import numpy as np
 import pandas as pd
 from scipy.special import expit
 from scipy.stats import norm
-from sports_bettors.dashboard.params import params, utils
+from sports_bettors.dashboard.params import params
+from sports_bettors.utils.features import create_features
+from sports_bettors.utils.college_football import features as college_features
+from sports_bettors.utils.nfl import features as nfl_features
+from sports_bettors.utils.cache import DiskCache, MemoryCache
+from sports_bettors.dashboard.utils.cube import load_cube
 
-from sports_bettors.api import SportsPredictor
+from sports_bettors.registry import registry
 
 from config import Config
 
+# Results of previous queries, keyed on the query and the predictor set that produced them
+results_cache = MemoryCache(Config.RESULTS_CACHE_BYTES) if Config.RESULTS_CACHE == 'memory' else \
+    DiskCache(os.path.join(Config.CACHE_DIR, 'results'), Config.RESULTS_CACHE_BYTES)
+
+
+# Responses fit on every game, whose feature centers are the training means (margins are fit on wins or losses only)
+unfiltered_responses = ['Win', 'Margin', 'TotalPoints']
+
+
+def default_parameters(league: str, feature_set: str, variable: str) -> dict:
+    """
+    Inputs of a feature set other than the variable at their training means in the served predictor set, i.e. at zero
+    once scaled as when a blank input is left out of a prediction
+    """
+    compiled = registry.get(league, Config.sb_version).compiled
+    if feature_set not in compiled.feature_sets:
+        return {}
+    arrays = compiled.feature_sets[feature_set]
+    fit = np.array(arrays['available'])
+    unfiltered = fit & np.isin(compiled.responses, unfiltered_responses)[None, :]
+    centers = np.array(arrays['centers'])[unfiltered if unfiltered.any() else fit]
+    return {p['value']: float(centers[:, arrays['features'].index(p['value'])].mean())
+            for p in params[Config.sb_version]['variable-opts'][league][feature_set]
+            if (p['value'] != variable) and (p['value'] in arrays['features'])}
+
 
 class ResultsPopulator(object):
     response_ranges = params[Config.sb_version]['response-ranges']
+    league_features = {'college_football': college_features, 'nfl': nfl_features}
 
     def __init__(self,
                  league: str,
@@ -22,54 +56,86 @@ class ResultsPopulator(object):
         assert league in ['nfl', 'college_football']
         self.league = league
         self.feature_set = feature_set
-        self.feature_creators = utils['feature_creators'][Config.sb_version][self.league][self.feature_set]
+        self.feature_creators = self.league_features[self.league].feature_creators
+        # Model features that aren't inputs on the dashboard are derived from the inputs
+        self.derived_features = [
+            feature for feature in self.league_features[self.league].feature_sets[self.feature_set].features
+            if feature not in [
+                p['value'] for p in params[Config.sb_version]['variable-opts'][self.league][self.feature_set]
+            ]
+        ]
         self.team = team
         self.opponent = opponent
         self.variable = variable
         self.variable_vals = params[Config.sb_version]['variable-ranges'][self.league][self.variable]
         self.parameters = parameters
-        self.predictor = SportsPredictor(league=league, version=Config.sb_version)
-        self.predictor.load()
+        # Compiled predictor set shared by the process, no training stack needed
+        self.predictor = registry.get(league, Config.sb_version).compiled
+        self._perspectives = {}
+        self._cube_slice = None
+
+    def _cube(self) -> dict:
+        """
+        This query's arrays from the precomputed results cube when the cube was built from the served predictor set at
+        these parameters, otherwise None
+        """
+        if self._cube_slice is None:
+            self._cube_slice = {}
+            cube = load_cube(self.league)
+            if (cube is not None) and all([self.team, self.opponent]) and \
+                    cube.matches(registry.token(self.league), self.feature_set, self.variable, self.parameters):
+                self._cube_slice = cube.slice(self.team, self.opponent, self.feature_set, self.variable)
+        return self._cube_slice if len(self._cube_slice) > 0 else None
+
+    def _grid(self) -> dict:
+        """
+        Inputs for every value of the variable as arrays, with the derived features
+        """
+        n_vals = len(self.variable_vals)
+        # Drop features derived from a previous value of the variable
+        grid = {feature: np.full(n_vals, val) for feature, val in self.parameters.items()
+                if feature not in self.derived_features}
+        grid[self.variable] = np.array(list(self.variable_vals))
+        return create_features(grid, self.derived_features, self.feature_creators)
+
+    def _perspective(self, is_opponent: bool) -> dict:
+        """
+        Predictions of every response over the variable's grid from the team's (or opponent's) model, predicted once
+        and shared by win, margins and total points
+        """
+        if is_opponent not in self._perspectives:
+            self._perspectives[is_opponent] = self.predictor.predict_batch(
+                random_effect='team' if not is_opponent else 'opponent',
+                feature_set=self.feature_set,
+                teams=[self.team if not is_opponent else self.opponent] * len(self.variable_vals),
+                inputs=self._grid()
+            )
+        return self._perspectives[is_opponent]
 
-    def _derived_features(self):
+    def _response(self, is_opponent: bool, response: str) -> tuple:
         """
-        Add derived features to parameters
+        mu ([variable x bound]) and sigma ([bound]) of a response
         """
-        for created_feature, creator in self.feature_creators.items():
-            self.parameters[created_feature] = creator(self.parameters)
+        batch = self._perspective(is_opponent)
+        sdx = self.predictor.responses.index(response) if response in self.predictor.responses else None
+        if (sdx is None) or not batch['available'][sdx]:
+            raise KeyError(('team' if not is_opponent else 'opponent', self.feature_set, response))
+        return batch['mu'][:, sdx, :], batch['sigma'][sdx]
 
     def _win(self, is_opponent: bool) -> pd.DataFrame:
         """
         Calculate win probabilities for a team or an opponent
         """
-        records = []
-        for var in self.variable_vals:
-            # Add variable to parameters
-            self.parameters[self.variable] = var
-            # Add derived features
-            self._derived_features()
-            # Configure inputs
-            input_set = {
-                'random_effect': 'team' if not is_opponent else 'opponent',
-                'feature_set': self.feature_set,
-                'inputs': {'RandomEffect': self.team if not is_opponent else self.opponent}
-            }
-            input_set['inputs'].update(self.parameters)
-            # Predict
-            output = self.predictor.predict(**input_set)[
-                ('team' if not is_opponent else 'opponent', self.feature_set, 'Win')
-            ]
-            # Wrangle output
-            record = {
-                'RandomEffect': self.team if is_opponent else self.opponent,
-                self.variable: var,
-                'WinLB_opp' if is_opponent else 'WinLB_team': expit(output['mu']['lb']),
-                'Win_opp' if is_opponent else 'Win_team': expit(output['mu']['mean']),
-                'WinUB_opp' if is_opponent else 'WinUB_team': expit(output['mu']['ub'])
-            }
-            records.append(record)
+        mu, _ = self._response(is_opponent, 'Win')
+        suffix = '_opp' if is_opponent else '_team'
 
-        return pd.DataFrame().from_records(records)
+        return pd.DataFrame({
+            'RandomEffect': [self.team if is_opponent else self.opponent] * len(self.variable_vals),
+            self.variable: np.array(list(self.variable_vals)),
+            'WinLB' + suffix: expit(mu[:, 0]),
+            'Win' + suffix: expit(mu[:, 1]),
+            'WinUB' + suffix: expit(mu[:, 2])
+        })
 
     def win(self) -> pd.DataFrame:
         """
@@ -78,13 +144,22 @@ class ResultsPopulator(object):
         if not all([self.league, self.feature_set, self.team, self.opponent, self.variable]):
             return pd.DataFrame().from_records([])
 
-        # Get win probability from the team and opponent's perspectives
-        df_team = self._win(is_opponent=False)
-        df_opp = self._win(is_opponent=True)
+        cube = self._cube()
+        if cube is not None:
+            df = pd.DataFrame(dict(
+                [(self.variable, np.asarray(cube['variable_vals']))] +
+                [(column + suffix, expit(cube['win' + perspective][:, idx]))
+                 for perspective, suffix in [('.team', '_team'), ('.opp', '_opp')]
+                 for idx, column in enumerate(['WinLB', 'Win', 'WinUB'])]
+            ))
+        else:
+            # Get win probability from the team and opponent's perspectives
+            df_team = self._win(is_opponent=False)
+            df_opp = self._win(is_opponent=True)
 
-        # Merge
-        df = df_team.drop('RandomEffect', axis=1).merge(df_opp.drop('RandomEffect', axis=1),
-                                                        on=self.variable, how='inner')
+            # Merge
+            df = df_team.drop('RandomEffect', axis=1).merge(df_opp.drop('RandomEffect', axis=1),
+                                                            on=self.variable, how='inner')
 
         # Normalize so that P(Win) + P(Lose) = 1.0 calculated from each perspective
         df['Win'] = df['Win_team'] / (df['Win_team'] + (1 - df['Win_opp']))
@@ -93,52 +168,46 @@ class ResultsPopulator(object):
 
         return df
 
+    def _exceedance(self, is_opponent: bool, response: str, thresholds: range) -> dict:
+        """
+        P(response > threshold) and the distances to its lower / upper bounds over a [variable x threshold] grid
+        """
+        mu, sigma = self._response(is_opponent, response)
+        thresholds = np.array(list(thresholds))[None, :]
+        prob = 1 - norm.cdf(thresholds, mu[:, [1]], sigma[1])
+        return {
+            'Probability': prob,
+            'Probability_LB': prob - (1. - norm.cdf(thresholds, mu[:, [0]], sigma[2])),
+            'Probability_UB': (1. - norm.cdf(thresholds, mu[:, [2]], sigma[2])) - prob
+        }
+
     def _margins(self, is_opponent: bool) -> pd.DataFrame:
         """
         Probability of win margins
         """
-        records = []
-        for var in self.variable_vals:
-            # Add variable to parameters
-            self.parameters[self.variable] = var
-            # Add derived features
-            self._derived_features()
-            # Configure inputs
-            input_set = {
-                'random_effect': 'team' if not is_opponent else 'opponent',
-                'feature_set': self.feature_set,
-                'inputs': {'RandomEffect': self.team if not is_opponent else self.opponent}
+        frames = []
+        for margin_type in ['WinMargin', 'LossMargin', 'Margin']:
+            margins = self.response_ranges[self.league][margin_type]
+            probs = self._exceedance(is_opponent, margin_type, margins)
+            frame = {
+                'variable_val': np.repeat(np.array(list(self.variable_vals)), len(margins)),
+                'Margin': np.tile(np.array(list(margins)) * (-1 if margin_type == 'LossMargin' else 1),
+                                  len(self.variable_vals))
             }
-            input_set['inputs'].update(self.parameters)
-
-            # Probabilities for each margin-type
-            for margin_type in ['WinMargin', 'LossMargin', 'Margin']:
-                output = self.predictor.predict(**input_set)[(
-                    'team' if not is_opponent else 'opponent',
-                    self.feature_set,
-                    margin_type
-                )]
-                mu, sigma = output['mu']['mean'], output['sigma']['mean']
-                mu_lb = output['mu']['lb']
-                mu_ub, sigma_ub = output['mu']['ub'], output['sigma']['ub']
-                for margin in params[Config.sb_version]['response-ranges'][self.league][margin_type]:
-                    prob = 1 - norm.cdf(margin, mu, sigma)
-                    record = {
-                        'variable_val': var,
-                        'Margin': margin if margin_type != 'LossMargin' else -margin,
-                        'Probability': prob,
-                        'Probability_LB': prob - (1. - norm.cdf(margin, mu_lb, sigma_ub)),
-                        'Probability_UB': (1. - norm.cdf(margin, mu_ub, sigma_ub)) - prob,
-                        'Result': {'WinMargin': 'Win', 'LossMargin': 'Loss', 'Margin': 'Any'}.get(margin_type)
-                    }
-                    records.append(record)
-
-        return pd.DataFrame().from_records(records)
+            frame.update({column: values.ravel() for column, values in probs.items()})
+            frame['Result'] = {'WinMargin': 'Win', 'LossMargin': 'Loss', 'Margin': 'Any'}.get(margin_type)
+            frames.append(pd.DataFrame(frame))
+
+        return pd.concat(frames).reset_index(drop=True)
 
     def margins(self) -> pd.DataFrame:
         """
         Calculate probability of certain margins conditioned and not-conditioned on winners.
         """
+        cube = self._cube()
+        if cube is not None:
+            return self._from_cube(cube, 'margins', ['variable_val', 'Margin', 'Result'])
+
         df_team = self._margins(is_opponent=False)
         df_opp = self._margins(is_opponent=True)
         df = pd.concat([df_team, df_opp])
@@ -150,6 +219,17 @@ class ResultsPopulator(object):
 
         return df
 
+    @staticmethod
+    def _from_cube(cube: dict, frame: str, keys: list) -> pd.DataFrame:
+        """
+        Average the team and opponent perspectives of a precomputed frame
+        """
+        probs = (cube[frame + '.team'] + cube[frame + '.opp']) / 2
+        return pd.DataFrame(dict(
+            [(key, np.asarray(cube['{}.{}'.format(frame, key)]).tolist()) for key in keys] +
+            [(column, probs[:, idx]) for idx, column in enumerate(['Probability', 'Probability_LB', 'Probability_UB'])]
+        ))
+
     def _total_points(self, is_opponent: bool) -> pd.DataFrame:
         """
         Total points
@@ -157,48 +237,32 @@ class ResultsPopulator(object):
         if self.feature_set == 'PointsScored':
             return pd.DataFrame().from_records([])
 
-        records = []
-        for var in self.variable_vals:
-            # Add variable to parameters
-            self.parameters[self.variable] = var
-            # Add derived features
-            self._derived_features()
-            # Configure inputs
-            input_set = {
-                'random_effect': 'team' if not is_opponent else 'opponent',
-                'feature_set': self.feature_set,
-                'inputs': {'RandomEffect': self.team if not is_opponent else self.opponent}
-            }
-            input_set['inputs'].update(self.parameters)
-            # Results
-            output = self.predictor.predict(**input_set)[(
-                'team' if not is_opponent else 'opponent',
-                self.feature_set,
-                'TotalPoints'
-            )]
-            mu, sigma = output['mu']['mean'], output['sigma']['mean']
-            mu_lb = output['mu']['lb']
-            mu_ub, sigma_ub = output['mu']['ub'], output['sigma']['ub']
-            for total_points in params[Config.sb_version]['response-ranges'][self.league]['TotalPoints']:
-                prob = 1 - norm.cdf(total_points, mu, sigma)
-                record = {
-                    'variable_val': var,
-                    'TotalPoints': total_points,
-                    'Probability': prob,
-                    'Probability_LB': prob - (1. - norm.cdf(total_points, mu_lb, sigma_ub)),
-                    'Probability_UB': (1. - norm.cdf(total_points, mu_ub, sigma_ub)) - prob,
-                }
-                records.append(record)
-
-        return pd.DataFrame().from_records(records)
+        totals = self.response_ranges[self.league]['TotalPoints']
+        frame = {
+            'variable_val': np.repeat(np.array(list(self.variable_vals)), len(totals)),
+            'TotalPoints': np.tile(np.array(list(totals)), len(self.variable_vals))
+        }
+        frame.update({column: values.ravel()
+                      for column, values in self._exceedance(is_opponent, 'TotalPoints', totals).items()})
+
+        return pd.DataFrame(frame)
 
     def total_points(self) -> pd.DataFrame:
         """
         Total Points
         """
+        cube = self._cube()
+        if cube is not None:
+            if 'total_points.team' not in cube:
+                return pd.DataFrame().from_records([])
+            return self._from_cube(cube, 'total_points', ['variable_val', 'TotalPoints'])
+
         df_team = self._total_points(is_opponent=False)
         df_opp = self._total_points(is_opponent=True)
         df = pd.concat([df_team, df_opp])
+        # Total points aren't modeled from points scored
+        if df.shape[0] == 0:
+            return df
         df = df.groupby(['variable_val', 'TotalPoints']).agg(
             Probability=('Probability', 'mean'),
             Probability_LB=('Probability_LB', 'mean'),
@@ -1,23 +1,92 @@
 import os
+import json
+import uuid
+import queue
+import shutil
 import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Tuple
+
+import pandas as pd
 from tqdm import tqdm
 
 from sports_bettors.utils.college_football.models import CollegeFootballBettingAid
 from sports_bettors.utils.nfl.models import NFLBettingAid
+from sports_bettors.utils.dataset import LeagueDataset
+from sports_bettors.utils.artifact import artifact_name
 
 from config import Config, logger
 
 betting_aids = {'nfl': NFLBettingAid, 'college_football': CollegeFootballBettingAid}
 
+# Curated data shared by every experiment run in this process (or pool worker)
+datasets = {}
+
+
+def _get_dataset(league: str) -> LeagueDataset:
+    if league not in datasets:
+        datasets[league] = LeagueDataset(league)
+    return datasets[league]
 
-def execute_experiments(league: str, overwrite: bool = False, debug: bool = False):
+
+def _attach_dataset(league: str, path: str):
+    """
+    Pool initializer: use the curated data the parent memory-mapped instead of parsing another copy
     """
-    Execute experiments defined from betting aid objects
+    datasets[league] = LeagueDataset.attach(path)
+
+
+def _progress_path(league: str) -> str:
+    return os.path.join(Config.CACHE_DIR, 'experiments', '{}_{}.json'.format(league, Config.sb_version))
+
+
+def _load_progress(league: str) -> dict:
+    if not os.path.exists(_progress_path(league)):
+        return {}
+    with open(_progress_path(league), 'r') as fp:
+        return json.load(fp)
+
+
+def _save_progress(league: str, progress: dict):
+    """
+    Write the status of every experiment so a run can be monitored and resumed
+    """
+    path = _progress_path(league)
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path + '.tmp', 'w') as fp:
+        json.dump(progress, fp, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+class _LocalReporter(object):
+    """
+    Stand-in for a worker queue when experiments run in this process
+    """
+    def __init__(self, callback):
+        self.callback = callback
+
+    def put(self, item: tuple):
+        self.callback(*item)
+
+
+def _job_label(job: Tuple[str, str, str]) -> str:
+    random_effect, feature_set, response = job
+    return '{} ~ {} | {}'.format(feature_set, response, random_effect)
+
+
+def define_experiments(league: str, overwrite: bool = False, debug: bool = False, resume: bool = False) \
+        -> List[Tuple[str, str, str]]:
+    """
+    (random_effect, feature_set, response) combinations left to run for a league
     """
     betting_aid = betting_aids[league]
-    for random_effect in tqdm(betting_aid.random_effects):
-        for feature_set in tqdm(betting_aid.feature_sets.keys()):
-            for response in tqdm(betting_aid.responses):
+    progress = _load_progress(league) if resume else {}
+    jobs = []
+    for random_effect in betting_aid.random_effects:
+        for feature_set in betting_aid.feature_sets.keys():
+            for response in betting_aid.responses:
                 # Skip combinations that are over-specified
                 if (feature_set == 'PointsScored') and (response == 'TotalPoints'):
                     continue
@@ -26,19 +95,144 @@ def execute_experiments(league: str, overwrite: bool = False, debug: bool = Fals
                             (random_effect != 'team'):
                         continue
 
+                job = (random_effect, feature_set, response)
+                # Skip experiments completed before an interruption
+                if progress.get(_job_label(job), {}).get('stage') == 'done':
+                    logger.info('{} completed in a previous run, skipping'.format(_job_label(job)))
+                    continue
+
                 # Check if model already fit
                 if not overwrite:
-                    if os.path.exists(os.path.join(Config.RESULTS_DIR, 'sports_bettors', league, response, feature_set,
-                                                   random_effect, 'model_{}.pkl'.format(Config.sb_version))):
-                        logger.info('{} ~ {} | {} already exists, skipping'.format(feature_set, response,
-                                                                                   random_effect))
+                    model_dir = os.path.join(Config.RESULTS_DIR, 'sports_bettors', league, response, feature_set,
+                                             random_effect)
+                    if os.path.exists(os.path.join(model_dir, 'aid_{}.pkl'.format(Config.sb_version))) or \
+                            os.path.exists(os.path.join(model_dir, artifact_name(Config.sb_version))):
+                        logger.info('{} already exists, skipping'.format(_job_label(job)))
                         continue
-                # Fit, Diagnose, and save model
-                logger.info('{} ~ {} | {}'.format(feature_set, response, random_effect))
-                aid = betting_aid(random_effect=random_effect, features=feature_set, response=response)
-                aid.fit()
-                aid.diagnose()
-                aid.save()
+                jobs.append(job)
+
+    return jobs
+
+
+def run_experiment(league: str, job: Tuple[str, str, str], cores_per_fit: int, reporter=None,
+                   inference: str = 'nuts', reuse_adaptation: bool = False, store_fitted: bool = True,
+                   artifact_only: bool = False) -> Tuple[str, str, str]:
+    """
+    Fit, Diagnose, and save a single model, reporting each stage to `reporter`
+    """
+    def _report(stage: str):
+        if reporter is not None:
+            reporter.put((job, stage))
+
+    random_effect, feature_set, response = job
+    logger.info(_job_label(job))
+    # REML only handles linear responses, sample the rest
+    if (inference == 'reml') and (betting_aids[league].response_distributions[response] != 'linear'):
+        logger.info('{} is not linear, fitting with nuts instead of reml'.format(response))
+        inference = 'nuts'
+    # One chain per core, and at least the default two chains
+    aid = betting_aids[league](random_effect=random_effect, features=feature_set, response=response,
+                               chains=max(cores_per_fit, 2), n_jobs=cores_per_fit, inference=inference,
+                               reuse_adaptation=reuse_adaptation, store_fitted=store_fitted,
+                               dataset=_get_dataset(league))
+    _report('fitting')
+    aid.fit()
+    _report('diagnosing')
+    aid.diagnose()
+    _report('saving')
+    aid.save(artifact_only=artifact_only)
+    _report('done')
+
+    return job
+
+
+def execute_experiments(league: str, overwrite: bool = False, debug: bool = False, workers: int = 1,
+                        cores_per_fit: int = 2, resume: bool = False, inference: str = 'nuts',
+                        reuse_adaptation: bool = False, store_fitted: bool = True, artifact_only: bool = False):
+    """
+    Execute experiments defined from betting aid objects on a pool of `workers` processes, each sampling with
+    `cores_per_fit` cores
+    """
+    jobs = define_experiments(league, overwrite=overwrite, debug=debug, resume=resume)
+    if workers * cores_per_fit > multiprocessing.cpu_count():
+        logger.info('WARNING: {} workers x {} cores exceeds the {} available cores'.format(
+            workers, cores_per_fit, multiprocessing.cpu_count()))
+
+    # Track the stage of each experiment; finished experiments from a resumed run are kept
+    progress = _load_progress(league) if resume else {}
+    for job in jobs:
+        progress[_job_label(job)] = {'stage': 'queued', 'updated': str(pd.Timestamp.now())}
+    _save_progress(league, progress)
+
+    def _update(job: Tuple[str, str, str], stage: str, error: str = None):
+        progress[_job_label(job)] = {'stage': stage, 'updated': str(pd.Timestamp.now())}
+        if error is not None:
+            progress[_job_label(job)]['error'] = error
+        _save_progress(league, progress)
+
+    pbar = tqdm(total=len(jobs))
+    if workers <= 1:
+        # Run in this process
+        reporter = _LocalReporter(_update)
+        for job in jobs:
+            try:
+                run_experiment(league, job, cores_per_fit, reporter, inference, reuse_adaptation, store_fitted,
+                               artifact_only)
+            except KeyboardInterrupt:
+                logger.info('Stopping experiments; re-run with --resume to continue')
+                _update(job, 'interrupted')
+                raise
+            except Exception as err:
+                # Record the failure and move on to the rest of the grid, as the pool does
+                logger.info('{} failed: {}'.format(_job_label(job), err))
+                _update(job, 'failed', error=str(err))
+            pbar.update(1)
+        pbar.close()
+        return
+
+    # Parse the curated data once and share it with the workers through memory-mapped columns
+    shared_path = os.path.join(Config.CACHE_DIR, 'datasets', '{}_{}'.format(league, uuid.uuid4().hex[:12]))
+    datasets[league] = _get_dataset(league).share(shared_path)
+
+    with multiprocessing.Manager() as manager:
+        reporter = manager.Queue()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_attach_dataset,
+                                       initargs=(league, shared_path))
+        futures = {executor.submit(run_experiment, league, job, cores_per_fit, reporter, inference,
+                                   reuse_adaptation, store_fitted, artifact_only): job for job in jobs}
+        pending = set(futures.keys())
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=5, return_when=FIRST_COMPLETED)
+                # Drain stage reports from the workers
+                while True:
+                    try:
+                        job, stage = reporter.get_nowait()
+                    except queue.Empty:
+                        break
+                    _update(job, stage)
+                    logger.info('{}: {}'.format(_job_label(job), stage))
+                for future in done:
+                    job = futures[future]
+                    if future.exception() is not None:
+                        logger.info('{} failed: {}'.format(_job_label(job), future.exception()))
+                        _update(job, 'failed', error=str(future.exception()))
+                    else:
+                        _update(job, 'done')
+                    pbar.update(1)
+        except KeyboardInterrupt:
+            logger.info('Stopping experiments; re-run with --resume to continue')
+            for future in pending:
+                if progress[_job_label(futures[future])]['stage'] != 'queued':
+                    _update(futures[future], 'interrupted')
+            raise
+        finally:
+            # Drop what hasn't started and wait for running fits, which read the shared dataset until they finish
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            pbar.close()
+            shutil.rmtree(shared_path, ignore_errors=True)
 
 
 def run_experiments():
@@ -49,7 +243,22 @@ def run_experiments():
     parser.add_argument('--league', required=True)
     parser.add_argument('--overwrite', action='store_true')
     parser.add_argument('--debug', action='store_true')
+    parser.add_argument('--workers', type=int, default=1, help='Number of models to fit at once')
+    parser.add_argument('--cores-per-fit', type=int, default=2,
+                        help='Cores used to sample each model, one chain per core (at least 2 chains)')
+    parser.add_argument('--resume', action='store_true', help='Skip experiments finished in an interrupted run')
+    parser.add_argument('--inference', default='nuts', choices=['nuts', 'advi', 'map', 'reml'],
+                        help='Full sampling (nuts), a fast approximation (advi, map) or reml for linear responses')
+    parser.add_argument('--reuse-adaptation', action='store_true',
+                        help='Warm-start NUTS from previous fits of the same response, random effect and feature set')
+    parser.add_argument('--skip-fitted', action='store_true',
+                        help='Keep per-observation fitted values (y_hat) out of the stored draws and summaries')
+    parser.add_argument('--artifact-only', action='store_true',
+                        help='Only save the compact json artifact of each fit, not the pickled betting aid')
     args = parser.parse_args()
     assert args.league in betting_aids.keys()
     logger.info('Running Experiments for {}; Overwrite {}'.format(args.league, args.overwrite))
-    execute_experiments(args.league, args.overwrite, args.debug)
+    execute_experiments(args.league, args.overwrite, args.debug, workers=args.workers,
+                        cores_per_fit=args.cores_per_fit, resume=args.resume, inference=args.inference,
+                        reuse_adaptation=args.reuse_adaptation, store_fitted=not args.skip_fitted,
+                        artifact_only=args.artifact_only)
@@ -0,0 +1,181 @@
+import os
+import json
+
+import numpy as np
+
+from sports_bettors.utils.arrays import save_arrays, load_arrays
+
+bounds = ['lb', 'mean', 'ub']
+
+# Arrays saved for each feature set; bump the schema when the layout changes
+arrays = ['centers', 'scales', 'coefficients', 'intercepts', 'sigma', 'available']
+schema_version = 1
+
+
+class CompiledPredictorSet(object):
+    """
+    Every predictor of a league as dense arrays so all responses for a batch of inputs come out of one numpy expression.
+    Each feature set holds, with random effects (e.g. team / opponent) and responses on the leading axes:
+        centers, scales: [random_effect x response x feature]
+        coefficients: [random_effect x response x bound x feature]
+        intercepts: [random_effect x team x response x bound], the last team row is the global intercept used for
+            teams a model hasn't seen
+        sigma: [random_effect x response x bound], nan for bernoulli responses
+        available: [random_effect x response], whether that model was fit
+    Teams are sorted so names map to integer ids with a binary search.
+    """
+    def __init__(self, league: str, version: str, random_effects: list, responses: list, teams: list,
+                 feature_sets: dict, token: str = None):
+        self.league = league
+        self.version = version
+        # Identifies a saved set across processes and machines (the name of its arrays directory)
+        self.token = token
+        self.random_effects = list(random_effects)
+        self.responses = list(responses)
+        self.teams = np.array(sorted(teams), dtype=str)
+        self.feature_sets = feature_sets
+
+    @classmethod
+    def from_predictors(cls, predictors: dict, league: str, version: str) -> 'CompiledPredictorSet':
+        """
+        Compile a {(random_effect, feature_set, response): BetPredictor} predictor set
+        """
+        random_effects = sorted(set([key[0] for key in predictors.keys()]))
+        responses = sorted(set([key[2] for key in predictors.keys()]))
+        teams = sorted(set([str(team) for predictor in predictors.values()
+                            for team in predictor.calculator['random_effect'].keys()]))
+        team_ids = dict(zip(teams, range(len(teams))))
+        n_re, n_responses, n_teams, n_bounds = len(random_effects), len(responses), len(teams), len(bounds)
+
+        feature_sets = {}
+        for feature_set in sorted(set([key[1] for key in predictors.keys()])):
+            keys = [key for key in predictors.keys() if key[1] == feature_set]
+            features = list(predictors[keys[0]].calculator['coefficients'].keys())
+            n_features = len(features)
+            arrays = {
+                'features': features,
+                'centers': np.zeros((n_re, n_responses, n_features)),
+                'scales': np.ones((n_re, n_responses, n_features)),
+                'coefficients': np.zeros((n_re, n_responses, n_bounds, n_features)),
+                'intercepts': np.zeros((n_re, n_teams + 1, n_responses, n_bounds)),
+                'sigma': np.full((n_re, n_responses, n_bounds), np.nan),
+                'available': np.zeros((n_re, n_responses), dtype=bool)
+            }
+            for random_effect, _, response in keys:
+                predictor = predictors[(random_effect, feature_set, response)]
+                rdx, sdx = random_effects.index(random_effect), responses.index(response)
+                for fdx, feature in enumerate(features):
+                    arrays['centers'][rdx, sdx, fdx] = predictor.scales[feature][0]
+                    arrays['scales'][rdx, sdx, fdx] = predictor.scales[feature][1]
+                    arrays['coefficients'][rdx, sdx, :, fdx] = predictor.calculator['coefficients'][feature]
+                # Teams the model didn't see get the global intercept, as in BetPredictor
+                re_mean, re_sd = predictor.re_params
+                arrays['intercepts'][rdx, :, sdx, :] = (re_mean - re_sd, re_mean, re_mean + re_sd)
+                for team, values in predictor.calculator['random_effect'].items():
+                    arrays['intercepts'][rdx, team_ids[str(team)], sdx, :] = values
+                if 'noise' in predictor.calculator.keys():
+                    arrays['sigma'][rdx, sdx, :] = predictor.calculator['noise']
+                arrays['available'][rdx, sdx] = True
+            feature_sets[feature_set] = arrays
+
+        return cls(league, version, random_effects, responses, teams, feature_sets)
+
+    def save(self, path: str):
+        """
+        Save as a directory of .npy files plus an index.json, swapped in so readers only ever see a complete set (see
+        `save_arrays`)
+        """
+        index = {
+            'schema_version': schema_version,
+            'league': self.league,
+            'version': self.version,
+            'random_effects': self.random_effects,
+            'responses': self.responses,
+            'teams': self.teams.tolist(),
+            'feature_sets': {feature_set: values['features'] for feature_set, values in self.feature_sets.items()}
+        }
+        index = save_arrays(path, index, {'{}.{}'.format(feature_set, name): values[name]
+                                          for feature_set, values in self.feature_sets.items() for name in arrays})
+        self.token = index['arrays']
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'CompiledPredictorSet':
+        """
+        Load a saved set, memory-mapping the arrays so processes serving the same set share their pages
+        """
+        with open(os.path.join(path, 'index.json'), 'r') as fp:
+            index = json.load(fp)
+        if index['schema_version'] > schema_version:
+            raise ValueError('Predictor set schema {} is newer than supported ({})'.format(
+                index['schema_version'], schema_version))
+        loaded = load_arrays(path, index, ['{}.{}'.format(feature_set, name) for feature_set in index['feature_sets']
+                                           for name in arrays], mmap=mmap)
+        feature_sets = {}
+        for feature_set, features in index['feature_sets'].items():
+            feature_sets[feature_set] = {'features': features}
+            for name in arrays:
+                feature_sets[feature_set][name] = loaded['{}.{}'.format(feature_set, name)]
+
+        return cls(index['league'], index['version'], index['random_effects'], index['responses'], index['teams'],
+                   feature_sets, token=index['arrays'])
+
+    def team_ids(self, teams) -> np.ndarray:
+        """
+        Integer ids of team names; unknown teams get the id of the global intercept row
+        """
+        teams = np.asarray(teams).astype(str)
+        if self.teams.shape[0] == 0:
+            return np.zeros(teams.shape[0], dtype=int)
+        ids = np.clip(np.searchsorted(self.teams, teams), 0, self.teams.shape[0] - 1)
+        return np.where(self.teams[ids] == teams, ids, self.teams.shape[0])
+
+    def predict_batch(self, random_effect: str, feature_set: str, teams, inputs: dict) -> dict:
+        """
+        Predict every response for N rows. `teams` holds the random effect of each row and `inputs` maps feature names
+        to length N arrays; features that are missing (or nan) are imputed to their training mean. Returns `mu` as
+        [N x response x bound] and `sigma` as [response x bound] along with the `available` response mask.
+        """
+        arrays = self.feature_sets[feature_set]
+        rdx = self.random_effects.index(random_effect)
+        team_ids = self.team_ids(np.atleast_1d(teams))
+
+        # Scale each row once per response; missing features are zero once scaled
+        x = np.full((team_ids.shape[0], len(arrays['features'])), np.nan)
+        for fdx, feature in enumerate(arrays['features']):
+            if feature in inputs:
+                x[:, fdx] = inputs[feature]
+        x = np.nan_to_num((x[:, None, :] - arrays['centers'][rdx]) / arrays['scales'][rdx], nan=0.)
+
+        mu = arrays['intercepts'][rdx][team_ids] + np.einsum('nrf,rbf->nrb', x, arrays['coefficients'][rdx])
+
+        return {'mu': mu, 'sigma': arrays['sigma'][rdx], 'available': arrays['available'][rdx]}
+
+    def predict(self, random_effect: str, feature_set: str, inputs: dict) -> dict:
+        """
+        Predict a single set of inputs ('RandomEffect' plus features) with the output layout of `BetPredictor`, keyed
+        by (random_effect, feature_set, response) for every fit response
+        """
+        if (feature_set not in self.feature_sets) or (random_effect not in self.random_effects):
+            return {}
+        batch = self.predict_batch(random_effect, feature_set, [inputs.get('RandomEffect')],
+                                   {feature: np.atleast_1d(val) for feature, val in inputs.items()
+                                    if feature != 'RandomEffect'})
+
+        return {(random_effect, feature_set, response): output
+                for response, output in self.outputs(batch, 0).items()}
+
+    def outputs(self, batch: dict, row: int) -> dict:
+        """
+        {response: {'mu': {lb, mean, ub}, 'sigma': {lb, mean, ub}}} for one row of `predict_batch`, sigma only for
+        continuous responses
+        """
+        outputs = {}
+        for sdx, response in enumerate(self.responses):
+            if not batch['available'][sdx]:
+                continue
+            output = {'mu': dict(zip(bounds, batch['mu'][row, sdx].tolist()))}
+            if not np.isnan(batch['sigma'][sdx]).any():
+                output['sigma'] = dict(zip(bounds, batch['sigma'][sdx].tolist()))
+            outputs[response] = output
+
+        return outputs
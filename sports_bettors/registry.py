@@ -0,0 +1,108 @@
+import os
+import time
+import pickle
+import threading
+from collections import namedtuple
+
+from sports_bettors.predictor_set import CompiledPredictorSet
+
+from config import Config, logger
+
+# A loaded predictor set: the {(random_effect, feature_set, response): BetPredictor} dict (None when loaded from the
+# compiled arrays), its compiled arrays, and the (path, mtime, size) of the file it was loaded from
+PredictorSet = namedtuple('PredictorSet', ['predictors', 'compiled', 'signature'])
+
+
+def predictor_set_path(league: str, version: str = Config.sb_version) -> str:
+    return os.path.join(Config.RESULTS_DIR, 'sports_bettors', league, 'predictor_set_{}.pkl'.format(version))
+
+
+def compiled_set_path(league: str, version: str = Config.sb_version) -> str:
+    return os.path.join(Config.RESULTS_DIR, 'sports_bettors', league, 'predictor_set_{}'.format(version))
+
+
+class PredictorRegistry(object):
+    """
+    Process-wide, thread-safe cache of predictor sets keyed by (league, version). The file behind each set is checked
+    at most every `check_interval` seconds and the set is reloaded when `sb_generate_predictors` replaces it; readers
+    keep using the previous set until the new one is fully loaded.
+
+    Compiled sets (a directory of .npy files, see `CompiledPredictorSet.save`) are memory-mapped and only need numpy;
+    the pickled dict of BetPredictors is the fallback for sets generated before they existed.
+    """
+    def __init__(self, check_interval: float = 1.):
+        self.check_interval = check_interval
+        self._sets = {}
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(league: str, version: str) -> tuple:
+        path = os.path.join(compiled_set_path(league, version), 'index.json')
+        if not os.path.exists(path):
+            path = predictor_set_path(league, version)
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _load(league: str, version: str, signature: tuple) -> PredictorSet:
+        logger.info('Loading predictor set for {} from {}'.format(league, signature[0]))
+        if signature[0] != predictor_set_path(league, version):
+            return PredictorSet(None, CompiledPredictorSet.load(compiled_set_path(league, version)), signature)
+        with open(predictor_set_path(league, version), 'rb') as fp:
+            predictors = pickle.load(fp)
+        return PredictorSet(predictors, CompiledPredictorSet.from_predictors(predictors, league, version), signature)
+
+    def get(self, league: str, version: str = Config.sb_version) -> PredictorSet:
+        """
+        Loaded predictor set for a league, (re)loading it if the file is new or has changed
+        """
+        key = (league, version)
+        predictor_set = self._sets.get(key)
+        if (predictor_set is not None) and (time.time() - self._checked.get(key, 0.) < self.check_interval):
+            return predictor_set
+
+        signature = self._signature(league, version)
+        if (predictor_set is None) or (predictor_set.signature != signature):
+            with self._lock:
+                # Another thread may have loaded it while this one waited
+                predictor_set = self._sets.get(key)
+                if (predictor_set is None) or (predictor_set.signature != signature):
+                    predictor_set = self._load(league, version, signature)
+                    self._sets[key] = predictor_set
+        self._checked[key] = time.time()
+
+        return predictor_set
+
+    def warmup(self, leagues: list = None, version: str = Config.sb_version):
+        """
+        Load predictor sets ahead of the first request, skipping leagues without one
+        """
+        for league in ['nfl', 'college_football'] if leagues is None else leagues:
+            try:
+                self.get(league, version)
+            except FileNotFoundError:
+                logger.info('WARNING: No predictor set for {}, run `sb_generate_predictors`'.format(league))
+
+    def token(self, league: str, version: str = Config.sb_version) -> str:
+        """
+        Identifies the predictor set currently served for a league; changes whenever it is regenerated
+        """
+        predictor_set = self.get(league, version)
+        if predictor_set.compiled.token is not None:
+            return predictor_set.compiled.token
+        return '{}:{}:{}'.format(*predictor_set.signature)
+
+    def loaded(self) -> list:
+        """
+        (league, version) of every predictor set in memory
+        """
+        return list(self._sets.keys())
+
+    def clear(self):
+        with self._lock:
+            self._sets = {}
+            self._checked = {}
+
+
+registry = PredictorRegistry()
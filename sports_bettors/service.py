@@ -0,0 +1,95 @@
+from concurrent.futures import TimeoutError
+
+from flask import Blueprint, jsonify, request
+
+from sports_bettors.serving import MicroBatcher, validate
+from sports_bettors.registry import registry
+
+from config import logger
+
+# Requests from concurrent calls are evaluated together
+batcher = MicroBatcher()
+
+# Seconds a request waits for its prediction unless it asks for less
+default_timeout = 2.
+max_timeout = 10.
+
+predict_blueprint = Blueprint('sb_predict', __name__)
+
+
+def _predict(requests: list, timeout: float) -> list:
+    """
+    Submit every request before waiting on any so they land in the same batch
+    """
+    futures = []
+    for item in requests:
+        try:
+            futures.append(batcher.submit(validate(item)))
+        except (ValueError, KeyError, FileNotFoundError) as err:
+            futures.append(err)
+
+    results = []
+    for item, future in zip(requests, futures):
+        if isinstance(future, Exception):
+            results.append({'error': str(future), 'status': 400})
+            continue
+        try:
+            predictions = future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            results.append({'error': 'Timed out after {} seconds'.format(timeout), 'status': 504})
+            continue
+        except Exception as err:
+            logger.info('Prediction failed: {}'.format(err))
+            results.append({'error': str(err), 'status': 500})
+            continue
+        results.append({
+            'league': item['league'],
+            'random_effect': item['random_effect'],
+            'feature_set': item['feature_set'],
+            'predictions': predictions,
+            'status': 200
+        })
+
+    return results
+
+
+@predict_blueprint.route('/predict', methods=['POST'])
+def predict():
+    """
+    Predict one ({league, random_effect, feature_set, inputs}) or many (a list of them, or {"requests": [...]})
+    requests. An optional `timeout` query parameter (seconds) bounds the wait for each request.
+    """
+    body = request.get_json(silent=True)
+    if body is None:
+        return jsonify({'error': 'Expected a json body'}), 400
+    try:
+        timeout = min(float(request.args.get('timeout', default_timeout)), max_timeout)
+    except ValueError:
+        return jsonify({'error': 'timeout must be a number of seconds'}), 400
+
+    single = isinstance(body, dict) and ('requests' not in body)
+    requests = [body] if single else (body if isinstance(body, list) else body['requests'])
+    if not isinstance(requests, list):
+        return jsonify({'error': 'requests must be a list'}), 400
+    results = _predict(requests, timeout)
+
+    if single:
+        return jsonify(results[0]), results[0]['status']
+    return jsonify({'results': results}), 200
+
+
+@predict_blueprint.route('/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'ok'}), 200
+
+
+@predict_blueprint.route('/ready', methods=['GET'])
+def ready():
+    """
+    Ready once a predictor set is loaded (see `registry.warmup`)
+    """
+    loaded = ['{}_{}'.format(league, version) for league, version in registry.loaded()]
+    if len(loaded) == 0:
+        return jsonify({'status': 'loading', 'predictor_sets': loaded}), 503
+    return jsonify({'status': 'ready', 'predictor_sets': loaded}), 200
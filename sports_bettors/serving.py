@@ -0,0 +1,194 @@
+# Predictions from generated predictor sets without the training stack: only numpy (through the registry) is
+# imported here, so a cold start doesn't pay for pystan, matplotlib, sklearn or the betting aids.
+import re
+import time
+import queue
+import argparse
+import pprint
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+from sports_bettors.registry import registry
+
+from config import Config, logger
+
+# League and version name directories of the results tree, so only these ever reach the registry
+leagues = ['college_football', 'nfl']
+version_pattern = re.compile(r'v[0-9]+')
+
+
+def check_predictor_set(league: str, version: str):
+    """
+    Raise a ValueError for anything but a known league and a version like v2
+    """
+    if league not in leagues:
+        raise ValueError('league must be in {}'.format(leagues))
+    if not (isinstance(version, str) and version_pattern.fullmatch(version)):
+        raise ValueError('version must be v followed by a number, e.g. {}'.format(Config.sb_version))
+
+
+def predict(league: str, random_effect: str, feature_set: str, inputs: dict, version: str = Config.sb_version) \
+        -> dict:
+    """
+    Predict every response of a (random_effect, feature_set) from a league's predictor set; same output as `api`
+    """
+    check_predictor_set(league, version)
+    compiled = registry.get(league, version).compiled
+    if random_effect not in compiled.random_effects:
+        raise ValueError('random_effect must be in {}'.format(compiled.random_effects))
+    if feature_set not in compiled.feature_sets:
+        raise ValueError('feature_set must be in {}'.format(list(compiled.feature_sets.keys())))
+    if 'RandomEffect' not in inputs.keys():
+        raise ValueError('inputs need a RandomEffect')
+
+    return compiled.predict(random_effect, feature_set, inputs)
+
+
+def validate(request: dict) -> dict:
+    """
+    Check a {league, random_effect, feature_set, inputs} prediction request against its predictor set, filling in the
+    version
+    """
+    if not isinstance(request, dict):
+        raise ValueError('Each request must be an object with league, random_effect, feature_set and inputs')
+    missing = [key for key in ['league', 'random_effect', 'feature_set', 'inputs'] if key not in request]
+    if len(missing) > 0:
+        raise ValueError('Request is missing {}'.format(', '.join(missing)))
+    request = dict(request, version=request.get('version', Config.sb_version))
+    for key in ['league', 'random_effect', 'feature_set', 'version']:
+        if not isinstance(request[key], str):
+            raise ValueError('{} must be a string'.format(key))
+    if not isinstance(request['inputs'], dict):
+        raise ValueError('inputs must be an object of feature values')
+    check_predictor_set(request['league'], request['version'])
+    compiled = registry.get(request['league'], request['version']).compiled
+    if request['random_effect'] not in compiled.random_effects:
+        raise ValueError('random_effect must be in {}'.format(compiled.random_effects))
+    if request['feature_set'] not in compiled.feature_sets:
+        raise ValueError('feature_set must be in {}'.format(list(compiled.feature_sets.keys())))
+    if 'RandomEffect' not in request['inputs']:
+        raise ValueError('inputs need a RandomEffect')
+    for feature in compiled.feature_sets[request['feature_set']]['features']:
+        value = request['inputs'].get(feature)
+        # json booleans are ints to python
+        if (value is not None) and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError('{} must be a number'.format(feature))
+
+    return request
+
+
+class MicroBatcher(object):
+    """
+    Collects prediction requests submitted from many threads over a `window` (seconds) and evaluates them with one
+    `predict_batch` per (league, version, random_effect, feature_set). Each request gets a Future with
+    {response: {'mu': ..., 'sigma': ...}}.
+    """
+    def __init__(self, window: float = 0.005, max_batch: int = 4096):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if (self._worker is None) or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='sb-micro-batcher', daemon=True)
+                self._worker.start()
+
+    def submit(self, request: dict) -> Future:
+        """
+        Queue a validated request (see `validate`)
+        """
+        future = Future()
+        self._queue.put((request, future))
+        self._start()
+        return future
+
+    def predict(self, request: dict, timeout: float = 1.) -> dict:
+        """
+        Submit a request and wait for its prediction, raising concurrent.futures.TimeoutError after `timeout` seconds
+        """
+        future = self.submit(validate(request))
+        try:
+            return future.result(timeout=timeout)
+        finally:
+            # A request that timed out before its batch ran is dropped from it
+            future.cancel()
+
+    def _collect(self) -> list:
+        """
+        Block for the first request, then gather whatever arrives within the window
+        """
+        batch = [self._queue.get()]
+        deadline = time.time() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [(request, future) for request, future in self._collect() if future.set_running_or_notify_cancel()]
+            groups = {}
+            for request, future in batch:
+                # A malformed request fails on its own rather than stopping the worker with the batch queued
+                try:
+                    key = (request['league'], request['version'], request['random_effect'], request['feature_set'])
+                except (KeyError, TypeError) as err:
+                    future.set_exception(err)
+                    continue
+                groups.setdefault(key, []).append((request, future))
+            for key, group in groups.items():
+                try:
+                    self._evaluate(key, group)
+                except Exception as err:
+                    for _, future in group:
+                        if not future.done():
+                            future.set_exception(err)
+
+    @staticmethod
+    def _evaluate(key: tuple, group: list):
+        league, version, random_effect, feature_set = key
+        compiled = registry.get(league, version).compiled
+        inputs = [request['inputs'] for request, _ in group]
+        features = compiled.feature_sets[feature_set]['features']
+        values = {feature: np.array([row.get(feature) for row in inputs], dtype=float) for feature in features}
+        batch = compiled.predict_batch(random_effect, feature_set, [row['RandomEffect'] for row in inputs], values)
+        for row, (_, future) in enumerate(group):
+            future.set_result(compiled.outputs(batch, row))
+
+
+def predict_cli():
+    parser = argparse.ArgumentParser(prog='Sports Predictions')
+    parser.add_argument('--league', type=str, required=True)
+    parser.add_argument('--feature_set', type=str, required=True)
+    parser.add_argument('--random_effect', type=str, required=True)
+    parser.add_argument('--display_output', action='store_true')
+    args = parser.parse_args()
+
+    # Validate against the predictor set rather than the betting aids
+    compiled = registry.get(args.league).compiled
+    if args.feature_set not in compiled.feature_sets:
+        raise ValueError('feature_set must be in {}'.format(list(compiled.feature_sets.keys())))
+    if args.random_effect not in compiled.random_effects:
+        raise ValueError('random_effect must be in {}'.format(compiled.random_effects))
+
+    # Inputs
+    inputs = {'RandomEffect': input('Input Value for RandomEffect ({}): '.format(args.random_effect))}
+    for feature in compiled.feature_sets[args.feature_set]['features']:
+        inputs[feature] = float(input('Input Value for {}: '.format(feature)))
+
+    # Get predictions
+    output = predict(args.league, args.random_effect, args.feature_set, inputs)
+    if args.display_output:
+        pp = pprint.PrettyPrinter(indent=4, compact=True)
+        logger.info('Output: \n{}'.format(pp.pformat(output)))
+    return output
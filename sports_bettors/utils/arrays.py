@@ -0,0 +1,42 @@
+import os
+import json
+import uuid
+import shutil
+
+import numpy as np
+
+
+def save_arrays(path: str, index: dict, arrays: dict) -> dict:
+    """
+    Save {name: array} as .npy files plus an index.json. The arrays go in a new arrays_{uuid} sub-directory and
+    index.json, which names it, is swapped in last so readers only ever see a complete set. Returns the index written.
+    """
+    index = dict(index, arrays='arrays_{}'.format(uuid.uuid4().hex[:12]), names=sorted(arrays.keys()))
+
+    # Arrays of the set being replaced are kept for readers that loaded its index just before the swap
+    previous = None
+    if os.path.exists(os.path.join(path, 'index.json')):
+        with open(os.path.join(path, 'index.json'), 'r') as fp:
+            previous = json.load(fp).get('arrays')
+
+    os.makedirs(os.path.join(path, index['arrays']), exist_ok=True)
+    for name, values in arrays.items():
+        np.save(os.path.join(path, index['arrays'], name + '.npy'), values)
+    tmp_path = os.path.join(path, 'index.json.{}.tmp'.format(os.getpid()))
+    with open(tmp_path, 'w') as fp:
+        json.dump(index, fp)
+    os.replace(tmp_path, os.path.join(path, 'index.json'))
+
+    for fn in os.listdir(path):
+        if fn.startswith('arrays_') and (fn not in [index['arrays'], previous]):
+            shutil.rmtree(os.path.join(path, fn), ignore_errors=True)
+
+    return index
+
+
+def load_arrays(path: str, index: dict, names: list, mmap: bool = True) -> dict:
+    """
+    {name: array} of a set saved with `save_arrays`, memory-mapped so processes reading the same set share its pages
+    """
+    return {name: np.load(os.path.join(path, index['arrays'], name + '.npy'), mmap_mode='r' if mmap else None)
+            for name in names}
@@ -0,0 +1,112 @@
+import os
+import json
+
+import pandas as pd
+
+from config import Config
+
+# Bump when the layout of the json changes; readers refuse artifacts from a newer schema
+schema_version = 1
+
+
+class FitArtifact(object):
+    """
+    The parts of a fit betting aid a predictor needs (scales, random effect map, parameter table and fit metadata),
+    stored as a small json file instead of pickling the aid with its stan model and per-observation summary.
+    """
+    def __init__(self, league: str, random_effect: str, feature_label: str, features: list, response: str,
+                 response_distribution: str, scales: dict, random_effect_map: dict, parameters: pd.DataFrame,
+                 metadata: dict = None):
+        self.league = league
+        self.random_effect = random_effect
+        self.feature_label = feature_label
+        self.features = list(features)
+        self.response = response
+        self.response_distribution = response_distribution
+        self.scales = scales
+        self.random_effect_map = random_effect_map
+        self.parameters = parameters.reset_index(drop=True)
+        self.metadata = {} if metadata is None else metadata
+
+    @property
+    def random_effect_inv(self) -> dict:
+        return {'a[' + str(v) + ']': k for k, v in self.random_effect_map.items()}
+
+    @classmethod
+    def from_aid(cls, aid) -> 'FitArtifact':
+        """
+        Extract an artifact from a fit betting aid, dropping fitted values from the parameter table
+        """
+        if aid.summary is None:
+            raise ValueError('Fit a model first.')
+        parameters = aid.summary[~aid.summary['labels'].str.startswith('y_hat')][['labels', 'mean', 'sd']]
+        metadata = dict(getattr(aid, 'fit_metadata', {}))
+        metadata.update({'version': aid.version, 'inference': getattr(aid, 'inference', 'nuts')})
+
+        return cls(
+            league=aid.league,
+            random_effect=aid.random_effect,
+            feature_label=aid.feature_label,
+            features=aid.features,
+            response=aid.response,
+            response_distribution=aid.response_distributions[aid.response],
+            scales={feature: (float(mean), float(sd)) for feature, (mean, sd) in aid.scales.items()},
+            random_effect_map={str(k): int(v) for k, v in aid.random_effect_map.items()},
+            parameters=parameters,
+            metadata=metadata
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            'schema_version': schema_version,
+            'league': self.league,
+            'random_effect': self.random_effect,
+            'feature_label': self.feature_label,
+            'features': self.features,
+            'response': self.response,
+            'response_distribution': self.response_distribution,
+            'scales': {feature: list(scale) for feature, scale in self.scales.items()},
+            'random_effect_map': self.random_effect_map,
+            'parameters': {
+                'labels': list(self.parameters['labels']),
+                'mean': [float(v) for v in self.parameters['mean']],
+                'sd': [float(v) for v in self.parameters['sd']]
+            },
+            'metadata': self.metadata
+        }
+
+    @classmethod
+    def from_dict(cls, artifact: dict) -> 'FitArtifact':
+        if artifact.get('schema_version', 0) > schema_version:
+            raise ValueError('Artifact schema {} is newer than supported ({}), upgrade sports_bettors'.format(
+                artifact.get('schema_version'), schema_version))
+        return cls(
+            league=artifact['league'],
+            random_effect=artifact['random_effect'],
+            feature_label=artifact['feature_label'],
+            features=artifact['features'],
+            response=artifact['response'],
+            response_distribution=artifact['response_distribution'],
+            scales={feature: tuple(scale) for feature, scale in artifact['scales'].items()},
+            random_effect_map=artifact['random_effect_map'],
+            parameters=pd.DataFrame(artifact['parameters']),
+            metadata=artifact.get('metadata', {})
+        )
+
+    def save(self, path: str):
+        """
+        Write atomically so a predictor set generated mid-write never reads a partial artifact
+        """
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as fp:
+            json.dump(self.to_dict(), fp)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'FitArtifact':
+        with open(path, 'r') as fp:
+            return cls.from_dict(json.load(fp))
+
+
+def artifact_name(version: str = Config.sb_version) -> str:
+    return 'artifact_{}.json'.format(version)
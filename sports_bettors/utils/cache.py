@@ -0,0 +1,184 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import logger
+
+
+class DiskCache(object):
+    """
+    Size-capped cache of pickled objects on disk. When the cache grows past `max_bytes` the least recently used entries
+    are evicted; an entry's modification time is bumped every time it is read so mtime order is LRU order. With a `ttl`
+    (seconds) entries unused for longer expire.
+    """
+    suffix = '.pkl'
+
+    def __init__(self, cache_dir: str, max_bytes: int, ttl: float = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """
+        Hash an arbitrary set of parts into a file-system safe key
+        """
+        return hashlib.sha256('|'.join([str(part) for part in parts]).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def _entries(self) -> list:
+        """
+        (mtime, size, path) of every entry, least recently used first
+        """
+        if not os.path.exists(self.cache_dir):
+            return []
+        entries = []
+        for fn in os.listdir(self.cache_dir):
+            if not fn.endswith(self.suffix):
+                continue
+            path = os.path.join(self.cache_dir, fn)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Evicted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def _expired(self, mtime: float) -> bool:
+        return (self.ttl is not None) and (time.time() - mtime > self.ttl)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str, default=None):
+        """
+        Load an entry from the cache and mark it as recently used
+        """
+        path = self._path(key)
+        try:
+            if self._expired(os.stat(path).st_mtime):
+                self.delete(key)
+                return default
+        except FileNotFoundError:
+            return default
+        try:
+            with open(path, 'rb') as fp:
+                value = pickle.load(fp)
+            os.utime(path, None)
+        except OSError:
+            # Evicted by another process between the checks, a miss like any other
+            return default
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError) as err:
+            logger.info('Discarding unreadable cache entry {}: {}'.format(path, err))
+            self.delete(key)
+            return default
+        return value
+
+    def put(self, key: str, value, size: int = None):
+        """
+        Write an entry atomically so concurrent readers never see a partial file, then evict down to the size cap.
+        Entries are measured on disk, `size` is only accepted for parity with MemoryCache.
+        """
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as fp:
+            pickle.dump(value, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, keep: str = None):
+        """
+        Remove expired entries, then least recently used entries until the cache fits in `max_bytes`
+        """
+        entries = self._entries()
+        total = sum([size for _, size, _ in entries])
+        for mtime, size, path in entries:
+            if (total <= self.max_bytes) and not self._expired(mtime):
+                break
+            if path == keep:
+                continue
+            logger.info('Evicting {} from cache'.format(os.path.basename(path)))
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class MemoryCache(object):
+    """
+    In-process, thread-safe counterpart of DiskCache: least recently used entries are evicted once the entries' sizes
+    (their pickled size unless given) pass `max_bytes`, and with a `ttl` (seconds) once unused for longer
+    """
+    make_key = staticmethod(DiskCache.make_key)
+
+    def __init__(self, max_bytes: int, ttl: float = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self):
+        """
+        Drop entries unused for longer than the ttl, which are the first in LRU order
+        """
+        if self.ttl is None:
+            return
+        cutoff = time.time() - self.ttl
+        while (len(self._entries) > 0) and (next(iter(self._entries.values()))[2] < cutoff):
+            _, (_, evicted, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            self._expire()
+            if key not in self._entries:
+                return default
+            value, size, _ = self._entries.pop(key)
+            self._entries[key] = (value, size, time.time())
+            return value
+
+    def put(self, key: str, value, size: int = None):
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)) if size is None else size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size, time.time())
+            self._bytes += size
+            self._expire()
+            while self._bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            self._bytes = 0
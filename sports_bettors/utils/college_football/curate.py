@@ -4,6 +4,8 @@ import re
 from tqdm import tqdm
 import pandas as pd
 
+from sports_bettors.utils.store import write_curated
+
 from config import Config, logger
 
 
@@ -116,4 +118,4 @@ def curate_college():
     df_modeling['matchup'] = df_modeling.apply(lambda row: _define_matchup(row['team'], row['opponent']), axis=1)
 
     logger.info('Save Curated data for {} games.'.format(df_modeling.shape))
-    df_modeling.to_csv(os.path.join(CURATION_DIR, 'df_curated.csv'), index=False)
+    write_curated(df_modeling, 'college_football')
@@ -0,0 +1,29 @@
+from sports_bettors.utils.features import Features
+
+
+# Feature Definitions as column expressions of the curated data (or of other created features)
+feature_creators = {
+    'rush_yds_adv': lambda d: d['rushingYards'] - d['opp_rushingYards'],
+    'pass_yds_adv': lambda d: d['netPassingYards'] - d['opp_netPassingYards'],
+    'penalty_yds_adv': lambda d: d['penaltyYards'] - d['opp_penaltyYards'],
+    'to_margin': lambda d: d['turnovers'] - d['opp_turnovers'],
+    'ptime_adv': lambda d: d['possessionTime'] - d['opp_possessionTime'],
+    'firstdowns_adv': lambda d: d['firstDowns'] - d['opp_firstDowns'],
+    'pass_proportion': lambda d: d['passAttempts'] / (d['passAttempts'] + d['rushingAttempts']),
+    'total_points': lambda d: d['points'] + d['opp_points'],
+    'rush_yds_x_atms': lambda d: d['rushingYards'] * d['rushingAttempts'],
+    'pass_yds_x_atms': lambda d: d['netPassingYards'] * d['passAttempts'],
+    'rush_yds_adv_x_pass_yds_adv': lambda d: d['rush_yds_adv'] * d['pass_yds_adv'],
+    'rush_yds_x_pass_yds': lambda d: d['rushingYards'] * d['netPassingYards']
+}
+
+# Feature set to use for modeling (each value must be in the curated dataset or as a key in feature_creators)
+feature_sets = {
+    'RushOnly': Features('RushOnly', ['rushingYards', 'rushingAttempts', 'rush_yds_x_atms']),
+    'PassOnly': Features('PassOnly', ['netPassingYards', 'passAttempts', 'pass_yds_x_atms']),
+    'Offense': Features('Offense', ['rushingYards', 'netPassingYards', 'rushingAttempts', 'passAttempts',
+                                    'rush_yds_x_atms', 'pass_yds_x_atms', 'rush_yds_x_pass_yds']),
+    'OffenseAdv': Features('OffenseAdv', ['rush_yds_adv', 'pass_yds_adv', 'to_margin',
+                                          'rush_yds_adv_x_pass_yds_adv']),
+    'PointsScored': Features('PointsScored', ['total_points']),
+}
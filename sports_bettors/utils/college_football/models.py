@@ -1,19 +1,12 @@
 import os
-from collections import namedtuple
 
 import pandas as pd
 import numpy as np
 
-from sklearn.metrics import roc_curve, auc
-
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
-
 from sports_bettors.base import BaseBettingAid
+from sports_bettors.utils.college_football.features import feature_creators, feature_sets
 from config import Config, logger
 
-Features = namedtuple('Features', ['label', 'features'])
-
 
 class CollegeFootballBettingAid(BaseBettingAid):
     """
@@ -26,33 +19,9 @@ class CollegeFootballBettingAid(BaseBettingAid):
     # Poll to use when determining rank
     polls = ['APTop25Rank', 'BCSStandingsRank', 'CoachesPollRank']
 
-    # Feature Definitions
-    feature_creators = {
-        'rush_yds_adv': lambda row: row['rushingYards'] - row['opp_rushingYards'],
-        'pass_yds_adv': lambda row: row['netPassingYards'] - row['opp_netPassingYards'],
-        'penalty_yds_adv': lambda row: row['penaltyYards'] - row['opp_penaltyYards'],
-        'to_margin': lambda row: row['turnovers'] - row['opp_turnovers'],
-        'ptime_adv': lambda row: row['possessionTime'] - row['opp_possessionTime'],
-        'firstdowns_adv': lambda row: row['firstDowns'] - row['opp_firstDowns'],
-        'pass_proportion': lambda row: row['passAttempts'] / (row['passAttempts'] + row['rushingAttempts']),
-        'total_points': lambda row: row['points'] + row['opp_points'],
-        'rush_yds_x_atms': lambda row: row['rushingYards'] * row['rushingAttempts'],
-        'pass_yds_x_atms': lambda row: row['netPassingYards'] * row['passAttempts'],
-        'rush_yds_adv_x_pass_yds_adv': lambda row: (row['rushingYards'] - row['opp_rushingYards']) *
-                                                   (row['netPassingYards'] - row['opp_netPassingYards']),
-        'rush_yds_x_pass_yds': lambda row: row['rushingYards'] * row['netPassingYards']
-    }
-
-    # Feature set to use for modeling (each value must be in the curated dataset or as a key in feature_creators)
-    feature_sets = {
-        'RushOnly': Features('RushOnly', ['rushingYards', 'rushingAttempts', 'rush_yds_x_atms']),
-        'PassOnly': Features('PassOnly', ['netPassingYards', 'passAttempts', 'pass_yds_x_atms']),
-        'Offense': Features('Offense', ['rushingYards', 'netPassingYards', 'rushingAttempts', 'passAttempts',
-                                        'rush_yds_x_atms', 'pass_yds_x_atms', 'rush_yds_x_pass_yds']),
-        'OffenseAdv': Features('OffenseAdv', ['rush_yds_adv', 'pass_yds_adv', 'to_margin',
-                                              'rush_yds_adv_x_pass_yds_adv']),
-        'PointsScored': Features('PointsScored', ['total_points']),
-    }
+    # Feature Definitions and feature sets to use for modeling
+    feature_creators = feature_creators
+    feature_sets = feature_sets
 
     # Potential Responses
     responses = ['Win', 'WinMargin', 'LossMargin', 'TotalPoints', 'Margin']
@@ -85,6 +54,7 @@ class CollegeFootballBettingAid(BaseBettingAid):
     }
 
     # I/O
+    league = 'college_football'
     input_path = os.path.join(Config.DATA_DIR, 'sports_bettors', 'curated', 'college_football', 'df_curated.csv')
     results_dir = os.path.join(Config.RESULTS_DIR, 'sports_bettors', 'college_football')
 
@@ -103,11 +73,16 @@ class CollegeFootballBettingAid(BaseBettingAid):
         """
         if self.summary is None:
             raise ValueError('Fit a model first.')
+        # Plotting / metrics are only needed for diagnostics, not to load the aid
+        from sklearn.metrics import roc_curve, auc
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
 
         logger.info('Printing Results.')
         # Get trues
-        y = self.fit_transform(self.etl())['y']
-        preds = self.summary[self.summary['labels'].str.contains('y_hat')]['mean'].values
+        data = self.fit_transform(self.etl())
+        y = data['y']
+        preds = self.fitted_values(data)
 
         # Random Intercepts
         df_random_effects = self.summary[self.summary['labels'].str.startswith('a[')]. \
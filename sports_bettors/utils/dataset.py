@@ -0,0 +1,96 @@
+import os
+import json
+from collections import OrderedDict
+from typing import Tuple
+
+import pandas as pd
+import numpy as np
+from pandas.api.types import is_numeric_dtype
+
+from sports_bettors.utils.store import read_curated
+
+from config import logger
+
+
+class LeagueDataset(object):
+    """
+    Curated data for a league shared by every aid (fits and diagnostics) in a run. The curated data is parsed once,
+    each derived feature is computed once on the shared frame, and the transformed design for each
+    (feature_set, response, random_effect) is memoized and handed out read-only. Pool workers attach to a copy
+    memory-mapped from disk (see `share`) rather than each parsing their own.
+    """
+    def __init__(self, league: str, max_designs: int = 8):
+        self.league = league
+        self.max_designs = max_designs
+        self._df = None
+        self._designs = OrderedDict()
+
+    @property
+    def df(self) -> pd.DataFrame:
+        if self._df is None:
+            logger.info('Loading Curated Data')
+            self._df = read_curated(self.league)
+        return self._df
+
+    def design(self, aid, skip_scaling: bool = False) -> Tuple[dict, dict, dict]:
+        """
+        (pystan_data, scales, random_effect_map) for an aid, transforming the shared data on first request
+        """
+        key = (aid.feature_label, aid.response, aid.random_effect, aid.poll, skip_scaling)
+        if key in self._designs:
+            logger.info('Re-using transformed data for {}'.format(key))
+            self._designs.move_to_end(key)
+            return self._designs[key]
+
+        pystan_data = aid._fit_transform(self.df, skip_scaling=skip_scaling)
+        for value in pystan_data.values():
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+        self._designs[key] = (pystan_data, dict(aid.scales), dict(aid.random_effect_map))
+
+        # Only hold onto the most recent designs
+        while len(self._designs) > self.max_designs:
+            self._designs.popitem(last=False)
+
+        return self._designs[key]
+
+    def share(self, path: str) -> 'LeagueDataset':
+        """
+        Save the curated data under `path` as one .npy per column and return a dataset memory-mapping it. Processes
+        attached to the same path (see `attach`) share the pages of the numeric columns; string columns are saved as
+        codes and rebuilt as objects in each process so they behave as when read from the curated data.
+        """
+        if not os.path.exists(path):
+            os.makedirs(path)
+        columns = []
+        for idx, (column, values) in enumerate(self.df.items()):
+            entry = {'name': column, 'file': 'column_{}.npy'.format(idx)}
+            if is_numeric_dtype(values):
+                np.save(os.path.join(path, entry['file']), values.to_numpy())
+            else:
+                codes, categories = pd.factorize(values)
+                np.save(os.path.join(path, entry['file']), codes)
+                entry['categories'] = categories.tolist()
+            columns.append(entry)
+        with open(os.path.join(path, 'index.json'), 'w') as fp:
+            json.dump({'league': self.league, 'columns': columns}, fp)
+
+        return self.attach(path, max_designs=self.max_designs)
+
+    @classmethod
+    def attach(cls, path: str, max_designs: int = 8) -> 'LeagueDataset':
+        """
+        Dataset over curated data saved with `share`
+        """
+        with open(os.path.join(path, 'index.json'), 'r') as fp:
+            index = json.load(fp)
+        data = {}
+        for entry in index['columns']:
+            values = np.load(os.path.join(path, entry['file']), mmap_mode='r')
+            if 'categories' in entry:
+                # -1 codes were missing values
+                values = np.append(np.array(entry['categories'], dtype=object), np.nan)[values]
+            data[entry['name']] = values
+        dataset = cls(index['league'], max_designs=max_designs)
+        dataset._df = pd.DataFrame(data, copy=False)
+        return dataset
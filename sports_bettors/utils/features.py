@@ -0,0 +1,39 @@
+from collections import namedtuple
+
+
+Features = namedtuple('Features', ['label', 'features'])
+
+
+class _FeatureView(object):
+    """
+    Read-only view of `data` that derives a missing feature from `creators` the first time it is accessed, so creators
+    can be written in terms of raw columns or other created features
+    """
+    def __init__(self, data, creators: dict):
+        self.data = data
+        self.creators = creators
+        self.created = {}
+
+    def __getitem__(self, key: str):
+        if key in self.created:
+            return self.created[key]
+        if key in self.data:
+            return self.data[key]
+        if key in self.creators:
+            self.created[key] = self.creators[key](self)
+            return self.created[key]
+        raise KeyError(key)
+
+
+def create_features(data, features: list, creators: dict):
+    """
+    Add each feature in `features` that is defined in `creators` and not already in `data`.
+
+    Creators are column expressions (e.g. lambda d: d['points'] + d['opp_points']) so the same definitions evaluate
+    vectorized on a DataFrame or a dict of arrays when training, and on a dict of scalars or arrays when serving.
+    """
+    view = _FeatureView(data, creators)
+    for feature in features:
+        if (feature in creators) and (feature not in data):
+            data[feature] = view[feature]
+    return data
@@ -0,0 +1,97 @@
+from typing import Tuple
+
+import pandas as pd
+import numpy as np
+
+
+# Quantiles reported alongside mean / sd, matching the columns of a pystan summary
+quantiles = [2.5, 25, 50, 75, 97.5]
+
+
+def flatten_pars(pars: dict) -> Tuple[list, np.ndarray]:
+    """
+    Flatten a {name: array} dictionary of stan parameters into stan labels (a[1], a[2], ..., mu_a) and values
+    """
+    labels, values = [], []
+    for name, value in pars.items():
+        value = np.asarray(value, dtype=float)
+        if value.ndim == 0:
+            labels.append(name)
+            values.append(float(value))
+        else:
+            labels += ['{}[{}]'.format(name, idx + 1) for idx in range(value.size)]
+            values += list(value.ravel(order='F'))
+    return labels, np.array(values)
+
+
+def split_pars(fit, values) -> dict:
+    """
+    Split the flat vector of constrained values returned by `fit.constrain_pars` into {name: array}. The vector holds
+    every parameter, transformed parameter and generated quantity of `fit.model_pars` in order, each with the shape
+    given by `fit.par_dims` and flattened in column-major order as stan writes them.
+    """
+    values = np.asarray(values, dtype=float)
+    pars, start = {}, 0
+    for name, dims in zip(fit.model_pars, fit.par_dims):
+        size = int(np.prod(dims)) if len(dims) > 0 else 1
+        pars[name] = values[start] if len(dims) == 0 else values[start:start + size].reshape(dims, order='F')
+        start += size
+    if start != values.shape[0]:
+        raise ValueError('Expected {} constrained values, got {}'.format(start, values.shape[0]))
+    return pars
+
+
+def summarize_draws(labels: list, draws: np.ndarray, means: np.ndarray = None) -> pd.DataFrame:
+    """
+    Summarize a (draws x labels) array into the `labels` / `mean` / `sd` layout of a pystan summary. `means` replaces
+    the mean of the draws with a point estimate (e.g. the posterior mode)
+    """
+    summary = pd.DataFrame({
+        'mean': draws.mean(axis=0) if means is None else means,
+        'sd': draws.std(axis=0, ddof=1)
+    })
+    for q, values in zip(quantiles, np.percentile(draws, quantiles, axis=0)):
+        summary['{}%'.format(q)] = values
+
+    return summary.assign(labels=labels)
+
+
+def summarize_fitted(a_draws: np.ndarray, b_draws: np.ndarray, random_effect: np.ndarray, x: np.ndarray,
+                     chunk_size: int = 10000) -> pd.DataFrame:
+    """
+    Summarize y_hat = a[RandomEffect] + X * b from parameter draws without holding (draws x N) in memory at once.
+    `random_effect` is indexed from 1 as in stan.
+    """
+    random_effect = np.asarray(random_effect) - 1
+    summaries = []
+    for start in range(0, x.shape[0], chunk_size):
+        stop = min(start + chunk_size, x.shape[0])
+        y_hat = a_draws[:, random_effect[start:stop]] + b_draws.dot(x[start:stop].T)
+        summaries.append(summarize_draws(['y_hat[{}]'.format(idx + 1) for idx in range(start, stop)], y_hat))
+
+    return pd.concat(summaries).reset_index(drop=True)
+
+
+def laplace_draws(fit, upars: np.ndarray, n_draws: int, seed: int = 187, step: float = 1e-4) -> np.ndarray:
+    """
+    Draw from a normal approximation to the posterior at its mode `upars` (unconstrained space). The Hessian of the
+    log-density is estimated by central differences of the gradient of `fit`, a StanFit4Model on the same data.
+    `optimizing` finds the mode of the density without the Jacobian of the constraining transforms, so the curvature
+    is taken from that same density (`adjust_transform=False`), whose gradient is zero at the mode.
+    """
+    dim = upars.shape[0]
+    hessian = np.zeros((dim, dim))
+    for idx in range(dim):
+        shift = np.zeros(dim)
+        shift[idx] = step
+        hessian[:, idx] = (np.asarray(fit.grad_log_prob(upars + shift, adjust_transform=False)) -
+                           np.asarray(fit.grad_log_prob(upars - shift, adjust_transform=False))) / (2 * step)
+    hessian = (hessian + hessian.T) / 2
+
+    # Covariance is the inverse of the negative Hessian; clip eigenvalues so it is positive definite
+    eigvals, eigvecs = np.linalg.eigh(-hessian)
+    eigvals = np.clip(eigvals, 1e-8, None)
+    cov_root = eigvecs / np.sqrt(eigvals)
+
+    rng = np.random.RandomState(seed)
+    return upars + rng.standard_normal((n_draws, dim)).dot(cov_root.T)
@@ -6,6 +6,8 @@ import pandas as pd
 import numpy as np
 from tqdm import tqdm
 
+from sports_bettors.utils.store import write_curated
+
 from config import Config, logger
 
 
@@ -180,4 +182,4 @@ def curate_nfl():
     df_modeling['matchup'] = df_modeling.apply(lambda row: _define_matchup(row['team'], row['opponent']), axis=1)
 
     logger.info('Save Curated data for {} games.'.format(df_modeling.shape[0]))
-    df_modeling.to_csv(os.path.join(Config.DATA_DIR, 'sports_bettors', 'curated', 'nfl', 'df_curated.csv'), index=False)
+    write_curated(df_modeling, 'nfl')
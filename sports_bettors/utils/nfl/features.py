@@ -0,0 +1,29 @@
+from sports_bettors.utils.features import Features
+
+
+# Feature Definitions as column expressions of the curated data (or of other created features)
+feature_creators = {
+    'rush_yds_adv': lambda d: d['rushYards'] - d['opp_rushYards'],
+    'pass_yds_adv': lambda d: d['NetPassYards'] - d['opp_NetPassYards'],
+    'penalty_yds_adv': lambda d: d['penaltyYards'] - d['opp_penaltyYards'],
+    'to_margin': lambda d: d['Turnovers'] - d['opp_Turnovers'],
+    'ptime_adv': lambda d: d['possessionTime'] - d['opp_possessionTime'],
+    'firstdowns_adv': lambda d: d['FirstDowns'] - d['opp_FirstDowns'],
+    'pass_proportion': lambda d: d['passAttempts'] / (d['passAttempts'] + d['rushAttempts']),
+    'total_points': lambda d: d['points'] + d['opp_points'],
+    'rush_yds_x_atms': lambda d: d['rushYards'] * d['rushAttempts'],
+    'pass_yds_x_atms': lambda d: d['NetPassYards'] * d['passAttempts'],
+    'rush_yds_adv_x_pass_yds_adv': lambda d: d['rush_yds_adv'] * d['pass_yds_adv'],
+    'rush_yds_x_pass_yds': lambda d: d['rushYards'] * d['NetPassYards']
+}
+
+# Feature set to use for modeling (each value must be in the curated dataset or as a key in feature_creators)
+feature_sets = {
+    'RushOnly': Features('RushOnly', ['rushYards', 'rushAttempts', 'rush_yds_x_atms']),
+    'PassOnly': Features('PassOnly', ['NetPassYards', 'passAttempts', 'pass_yds_x_atms']),
+    'Offense': Features('Offense', ['rushYards', 'NetPassYards', 'rushAttempts', 'passAttempts',
+                                    'rush_yds_x_atms', 'pass_yds_x_atms', 'rush_yds_x_pass_yds']),
+    'OffenseAdv': Features('OffenseAdv', ['rush_yds_adv', 'pass_yds_adv', 'to_margin',
+                                          'rush_yds_adv_x_pass_yds_adv']),
+    'PointsScored': Features('PointsScored', ['total_points']),
+}
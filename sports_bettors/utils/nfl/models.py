@@ -1,18 +1,11 @@
 import os
-from collections import namedtuple
 
 import numpy as np
 
-from sklearn.metrics import roc_curve, auc
-
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
-
 from sports_bettors.base import BaseBettingAid
+from sports_bettors.utils.nfl.features import feature_creators, feature_sets
 from config import Config, logger
 
-Features = namedtuple('Features', ['label', 'features'])
-
 
 class NFLBettingAid(BaseBettingAid):
     """
@@ -22,33 +15,9 @@ class NFLBettingAid(BaseBettingAid):
     # as they aren't as robust across time or across the season as college.
     random_effects = ['team', 'opponent']
 
-    # Feature Definitions
-    feature_creators = {
-        'rush_yds_adv': lambda row: row['rushYards'] - row['opp_rushYards'],
-        'pass_yds_adv': lambda row: row['NetPassYards'] - row['opp_NetPassYards'],
-        'penalty_yds_adv': lambda row: row['penaltyYards'] - row['opp_penaltyYards'],
-        'to_margin': lambda row: row['Turnovers'] - row['opp_Turnovers'],
-        'ptime_adv': lambda row: row['possessionTime'] - row['opp_possessionTime'],
-        'firstdowns_adv': lambda row: row['FirstDowns'] - row['opp_FirstDowns'],
-        'pass_proportion': lambda row: row['passAttempts'] / (row['passAttempts'] + row['rushAttempts']),
-        'total_points': lambda row: row['points'] + row['opp_points'],
-        'rush_yds_x_atms': lambda row: row['rushYards'] * row['rushAttempts'],
-        'pass_yds_x_atms': lambda row: row['NetPassYards'] * row['passAttempts'],
-        'rush_yds_adv_x_pass_yds_adv': lambda row: (row['rushYards'] - row['opp_rushYards']) *
-                                                   (row['NetPassYards'] - row['opp_NetPassYards']),
-        'rush_yds_x_pass_yds': lambda row: row['rushYards'] * row['NetPassYards']
-    }
-
-    # Feature set to use for modeling (each value must be in the curated dataset or as a key in feature_creators)
-    feature_sets = {
-        'RushOnly': Features('RushOnly', ['rushYards', 'rushAttempts', 'rush_yds_x_atms']),
-        'PassOnly': Features('PassOnly', ['NetPassYards', 'passAttempts', 'pass_yds_x_atms']),
-        'Offense': Features('Offense', ['rushYards', 'NetPassYards', 'rushAttempts', 'passAttempts',
-                                        'rush_yds_x_atms', 'pass_yds_x_atms', 'rush_yds_x_pass_yds']),
-        'OffenseAdv': Features('OffenseAdv', ['rush_yds_adv', 'pass_yds_adv', 'to_margin',
-                                              'rush_yds_adv_x_pass_yds_adv']),
-        'PointsScored': Features('PointsScored', ['total_points']),
-    }
+    # Feature Definitions and feature sets to use for modeling
+    feature_creators = feature_creators
+    feature_sets = feature_sets
 
     # Potential Responses
     responses = ['TotalPoints', 'Win', 'WinMargin', 'LossMargin', 'Margin']
@@ -81,6 +50,7 @@ class NFLBettingAid(BaseBettingAid):
     }
 
     # I/O
+    league = 'nfl'
     input_path = os.path.join(Config.DATA_DIR, 'sports_bettors', 'curated', 'nfl', 'df_curated.csv')
     results_dir = os.path.join(Config.RESULTS_DIR, 'sports_bettors', 'nfl')
 
@@ -90,11 +60,16 @@ class NFLBettingAid(BaseBettingAid):
         """
         if self.summary is None:
             raise ValueError('Fit a model first.')
+        # Plotting / metrics are only needed for diagnostics, not to load the aid
+        from sklearn.metrics import roc_curve, auc
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
 
         logger.info('Printing Results.')
         # Get trues
-        y = self.fit_transform(self.etl())['y']
-        preds = self.summary[self.summary['labels'].str.contains('y_hat')]['mean'].values
+        data = self.fit_transform(self.etl())
+        y = data['y']
+        preds = self.fitted_values(data)
 
         # Random Intercepts
         df_random_effects = self.summary[self.summary['labels'].str.startswith('a[')]. \
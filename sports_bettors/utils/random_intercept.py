@@ -0,0 +1,84 @@
+import pandas as pd
+import numpy as np
+from scipy.optimize import minimize_scalar
+from scipy.stats import norm
+
+from sports_bettors.utils.inference import quantiles
+
+
+def fit_random_intercept(pystan_data: dict, features: list, fitted: bool = True) -> pd.DataFrame:
+    """
+    Fit y ~ normal(a[RandomEffect] + X * b, sigma_y) with a ~ normal(mu_a, sigma_a) by REML without stan.
+
+    Takes the output of `fit_transform` and returns a summary with the labels of the stan model (a[j], mu_a, sigma_a,
+    sigma_y, b0..bK and, when `fitted`, y_hat[i]). Everything is computed from per-group sums so no (N x J) design
+    matrix is built: for a variance ratio lambda = sigma_a^2 / sigma_y^2 the marginal covariance of group j is
+    sigma_y^2 * (I + lambda * 11'), whose inverse only needs the group size and group sums.
+    """
+    y = np.asarray(pystan_data['y'], dtype=float)
+    group = np.asarray(pystan_data['RandomEffect']) - 1
+    n_groups = pystan_data['J']
+    n_obs = y.shape[0]
+    x = np.column_stack([np.asarray(pystan_data[feature], dtype=float) for feature in features]) if features \
+        else np.zeros((n_obs, 0))
+
+    # Fixed effects are the global intercept (mu_a) and coefficients (b)
+    w = np.column_stack([np.ones(n_obs), x])
+    n_fixed = w.shape[1]
+
+    # Group sums
+    n = np.bincount(group, minlength=n_groups).astype(float)
+    s_w = np.column_stack([np.bincount(group, weights=w[:, k], minlength=n_groups) for k in range(n_fixed)])
+    s_y = np.bincount(group, weights=y, minlength=n_groups)
+    wtw, wty, yty = w.T.dot(w), w.T.dot(y), y.dot(y)
+
+    def _gls(log_ratio: float):
+        """
+        Generalized least squares for the fixed effects at a given variance ratio
+        """
+        weight = np.exp(log_ratio) / (1. + n * np.exp(log_ratio))
+        a = wtw - (s_w * weight[:, None]).T.dot(s_w)
+        c = wty - (s_w * weight[:, None]).T.dot(s_y)
+        beta = np.linalg.solve(a, c)
+        rss = yty - np.sum(weight * s_y ** 2) - c.dot(beta)
+        return a, beta, rss
+
+    def _neg_reml(log_ratio: float) -> float:
+        """
+        Negative restricted log-likelihood with sigma_y profiled out (up to a constant)
+        """
+        a, _, rss = _gls(log_ratio)
+        return 0.5 * ((n_obs - n_fixed) * np.log(rss / (n_obs - n_fixed)) +
+                      np.sum(np.log1p(n * np.exp(log_ratio))) + np.linalg.slogdet(a)[1])
+
+    log_ratio = minimize_scalar(_neg_reml, bounds=(-20., 10.), method='bounded').x
+    a, beta, rss = _gls(log_ratio)
+    sigma_y = np.sqrt(rss / (n_obs - n_fixed))
+    sigma_a = np.sqrt(np.exp(log_ratio)) * sigma_y
+    beta_cov = sigma_y ** 2 * np.linalg.inv(a)
+    mu_a, b = beta[0], beta[1:]
+
+    # Best linear unbiased predictions of the intercepts shrink each group's mean residual towards mu_a
+    shrinkage = n * np.exp(log_ratio) / (1. + n * np.exp(log_ratio))
+    residual_mean = (s_y - s_w[:, 1:].dot(b)) / np.maximum(n, 1.)
+    intercepts = mu_a + shrinkage * (residual_mean - mu_a)
+    intercepts_var = np.where(n > 0, sigma_y ** 2 * shrinkage / np.maximum(n, 1.), sigma_a ** 2)
+
+    labels = ['a[{}]'.format(j + 1) for j in range(n_groups)] + ['mu_a', 'sigma_a', 'sigma_y'] + \
+        ['b{}'.format(fdx) for fdx in range(len(features))]
+    means = [intercepts, [mu_a, sigma_a, sigma_y], b]
+    # Large sample standard errors of the variance components
+    sds = [np.sqrt(intercepts_var),
+           [np.sqrt(beta_cov[0, 0]), sigma_a / np.sqrt(2. * max(n_groups - 1, 1)),
+            sigma_y / np.sqrt(2. * (n_obs - n_fixed))],
+           np.sqrt(np.diag(beta_cov)[1:])]
+    if fitted:
+        labels += ['y_hat[{}]'.format(idx + 1) for idx in range(n_obs)]
+        means.append(intercepts[group] + x.dot(b))
+        sds.append(np.sqrt(intercepts_var[group] + np.einsum('ij,jk,ik->i', x, beta_cov[1:, 1:], x)))
+
+    summary = pd.DataFrame({'mean': np.concatenate(means), 'sd': np.concatenate(sds)})
+    for q in quantiles:
+        summary['{}%'.format(q)] = summary['mean'] + norm.ppf(q / 100.) * summary['sd']
+
+    return summary.assign(labels=labels)
@@ -0,0 +1,110 @@
+import os
+import json
+import shutil
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from config import Config, logger
+
+
+# Curated data is partitioned by season so readers only touch the seasons they ask for
+partition_columns = {'college_football': 'season', 'nfl': 'year'}
+# Position of each row in the csv, partitions come back grouped by season so readers sort on it to match the csv
+row_column = '_row'
+
+
+def curated_dir(league: str) -> str:
+    return os.path.join(Config.DATA_DIR, 'sports_bettors', 'curated', league)
+
+
+def write_curated(df: pd.DataFrame, league: str):
+    """
+    Save curated data as csv and as a parquet dataset partitioned by season
+    """
+    df.to_csv(os.path.join(curated_dir(league), 'df_curated.csv'), index=False)
+
+    # Write the new dataset next to the old one and swap it in
+    path = os.path.join(curated_dir(league), 'df_curated.parquet')
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    df.assign(**{row_column: np.arange(df.shape[0])}).to_parquet(tmp_path, partition_cols=[partition_columns[league]],
+                                                                 index=False)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(tmp_path, path)
+
+    write_teams(df, league)
+
+
+def write_teams(df: pd.DataFrame, league: str):
+    """
+    Save a small index of the teams in curated data (games and seasons played) so the dashboard doesn't read the data
+    """
+    season_col = partition_columns[league]
+    teams = df.groupby('team')[season_col].agg(['count', 'min', 'max'])
+    index = {
+        'league': league,
+        'teams': {team: {'games': int(row['count']), 'first_season': int(row['min']), 'last_season': int(row['max'])}
+                  for team, row in teams.sort_index().iterrows()}
+    }
+    path = os.path.join(curated_dir(league), 'teams.json')
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'w') as fp:
+        json.dump(index, fp)
+    os.replace(tmp_path, path)
+
+
+@lru_cache(maxsize=8)
+def _load_teams(league: str, mtime_ns: int) -> dict:
+    with open(os.path.join(curated_dir(league), 'teams.json'), 'r') as fp:
+        return json.load(fp)['teams']
+
+
+def read_teams(league: str) -> dict:
+    """
+    {team: {games, first_season, last_season}} from the index written at curation, loaded once per curation. Data
+    curated before the index existed is indexed on first use.
+    """
+    path = os.path.join(curated_dir(league), 'teams.json')
+    if not os.path.exists(path):
+        logger.info('No teams index for {}, building it from curated data'.format(league))
+        write_teams(read_curated(league, columns=['team', partition_columns[league]]), league)
+    return _load_teams(league, os.stat(path).st_mtime_ns)
+
+
+def read_curated(league: str, columns: list = None, teams: list = None, opponents: list = None,
+                 seasons: list = None) -> pd.DataFrame:
+    """
+    Load curated data, reading only `columns` and only the rows for the given teams / opponents / seasons. Falls back to
+    the csv for data curated before the parquet store existed.
+    """
+    season_col = partition_columns[league]
+    path = os.path.join(curated_dir(league), 'df_curated.parquet')
+    if os.path.exists(path):
+        filters = [(col, 'in', list(vals)) for col, vals in [('team', teams), ('opponent', opponents),
+                                                             (season_col, seasons)] if vals is not None]
+        # Stores written before the row column existed come back grouped by season
+        ordered = row_column in ds.dataset(path, format='parquet', partitioning='hive').schema.names
+        read_columns = None if columns is None else list(columns) + ([row_column] if ordered else [])
+        df = pd.read_parquet(path, columns=read_columns, filters=filters if filters else None)
+        # Partition values come back as categoricals
+        if season_col in df.columns:
+            df[season_col] = df[season_col].astype(int)
+        if ordered:
+            df = df.sort_values(row_column, kind='mergesort').drop(columns=[row_column])
+        return df.reset_index(drop=True)
+
+    csv_path = os.path.join(curated_dir(league), 'df_curated.csv')
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError('No curated data, run `sb_curate`')
+    logger.info('No parquet store for {}, reading csv'.format(league))
+    df = pd.read_csv(csv_path, usecols=columns)
+    for col, vals in [('team', teams), ('opponent', opponents), (season_col, seasons)]:
+        if vals is not None:
+            df = df[df[col].isin(vals)]
+
+    return df.reset_index(drop=True)
@@ -0,0 +1,27 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from sports_bettors.utils.cache import DiskCache
+
+
+class TestDiskCache(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.cache = DiskCache(self.tmp_dir.name, max_bytes=1024 ** 2)
+
+    def test_round_trip(self):
+        self.cache.put('key', {'a': 1})
+        self.assertEqual(self.cache.get('key'), {'a': 1})
+        self.assertIsNone(self.cache.get('missing'))
+
+    def test_evicted_while_reading(self):
+        # Another process removes the entry after it's found, before it's opened or marked as used
+        self.cache.put('key', {'a': 1})
+        with mock.patch('builtins.open', side_effect=FileNotFoundError):
+            self.assertEqual(self.cache.get('key', default='miss'), 'miss')
+        with mock.patch.object(os, 'utime', side_effect=FileNotFoundError):
+            self.assertEqual(self.cache.get('key', default='miss'), 'miss')
+        self.assertEqual(self.cache.get('key'), {'a': 1})
@@ -8,6 +8,7 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_pdf import PdfPages
 
 from sports_bettors.utils.college_football.models import CollegeFootballBettingAid
+from sports_bettors.utils.artifact import FitArtifact, artifact_name
 
 from config import Config, logger
 
@@ -22,23 +23,32 @@ class TestPredictors(TestCase):
             predictors = pickle.load(fp)
 
         # Loop experiments
+        checked = 0
         for random_effect in CollegeFootballBettingAid.random_effects:
             for feature_set in CollegeFootballBettingAid.feature_sets.keys():
                 for response in CollegeFootballBettingAid.responses:
-                    # Check if it exists
-                    model_path = os.path.join(Config.RESULTS_DIR, 'sports_bettors', 'college_football', response,
-                                              feature_set, random_effect, 'aid_{}.pkl'.format(Config.sb_version))
-                    if not os.path.exists(model_path):
+                    # Check if it exists; models saved with `--artifact-only` only have their artifact
+                    model_dir = os.path.join(Config.RESULTS_DIR, 'sports_bettors', 'college_football', response,
+                                             feature_set, random_effect)
+                    model_path = os.path.join(model_dir, 'aid_{}.pkl'.format(Config.sb_version))
+                    if os.path.exists(model_path):
+                        with open(model_path, 'rb') as fp:
+                            aid = pickle.load(fp)
+                    elif os.path.exists(os.path.join(model_dir, artifact_name())):
+                        artifact = FitArtifact.load(os.path.join(model_dir, artifact_name()))
+                        aid = CollegeFootballBettingAid.from_artifact(artifact)
+                    else:
                         logger.info('WARNING: No model for {}, {}, {}'.format(random_effect, feature_set, response))
                         continue
-
-                    # Load betting aid
-                    with open(model_path, 'rb') as fp:
-                        aid = pickle.load(fp)
+                    checked += 1
 
                     logger.info('Load Data')
                     df_data = aid.etl()
 
+                    # Fitted values of the scaled data, from the summary or its parameters if y_hat wasn't stored
+                    logger.info('Get predictions from pystan summary')
+                    y_fit, y_fit_sd = aid.fitted_values(aid.fit_transform(df_data), sd=True)
+
                     # Transform the data but don't scale it
                     logger.info('Transform Data')
                     data = aid.fit_transform(df_data, skip_scaling=True)
@@ -46,21 +56,17 @@ class TestPredictors(TestCase):
                     data.pop('N')
                     data.pop('J')
                     df = pd.DataFrame.from_dict(data)
-
-                    logger.info('Get predictions from pystan summary')
-                    df['y_fit'] = aid.summary[aid.summary['labels'].str.contains('y_hat')]['mean'].values
-                    df['y_fit_lb'] = df['y_fit'] - aid.summary[aid.summary['labels'].str.contains('y_hat')]['sd'].values
-                    df['y_fit_ub'] = df['y_fit'] + aid.summary[aid.summary['labels'].str.contains('y_hat')]['sd'].values
+                    df['y_fit'] = y_fit
+                    df['y_fit_lb'] = df['y_fit'] - y_fit_sd
+                    df['y_fit_ub'] = df['y_fit'] + y_fit_sd
 
                     # Generate preds
                     logger.info('Generate Predictions')
                     predictor = predictors[(random_effect, feature_set, response)]
-                    df['y_preds'] = df[['RandomEffect'] + aid.features].apply(lambda r: predictor(r)['mu']['mean'],
-                                                                              axis=1)
-                    df['y_preds_lb'] = df[['RandomEffect'] + aid.features].apply(lambda r: predictor(r)['mu']['lb'],
-                                                                                 axis=1)
-                    df['y_preds_ub'] = df[['RandomEffect'] + aid.features].apply(lambda r: predictor(r)['mu']['ub'],
-                                                                                 axis=1)
+                    preds = predictor.predict_batch(df[['RandomEffect'] + aid.features])
+                    df['y_preds'] = preds['mu']['mean']
+                    df['y_preds_lb'] = preds['mu']['lb']
+                    df['y_preds_ub'] = preds['mu']['ub']
 
                     # Save
                     save_dir = os.path.join(Config.TEST_RESULTS_DIR, 'college_football', response, feature_set,
@@ -125,6 +131,8 @@ class TestPredictors(TestCase):
                         pdf.savefig()
                         plt.close()
 
+        self.assertGreater(checked, 0, 'No fit models found, run `sb_run_experiments`')
+
     def test_custom_college(self):
         with open(os.path.join(Config.RESULTS_DIR, 'sports_bettors', 'college_football',
                                'predictor_set_{}.pkl'.format(Config.sb_version)),
@@ -0,0 +1,43 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import numpy as np
+import pandas as pd
+
+from sports_bettors.utils import store
+from sports_bettors.dashboard.utils import history
+
+from config import Config
+
+
+def _curated(seed: int, games: int = 60) -> pd.DataFrame:
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame({'year': rng.choice([2009, 2010], games), 'team': rng.choice(['A', 'B', 'C'], games),
+                         'opponent': rng.choice(['A', 'B', 'C'], games), 'points': rng.randint(0, 40, games),
+                         'opp_points': rng.randint(0, 40, games), 'rushYards': 200. * rng.rand(games)})
+
+
+class TestHistory(TestCase):
+
+    def test_lookup(self):
+        with tempfile.TemporaryDirectory() as path, mock.patch.object(Config, 'DATA_DIR', path), \
+                mock.patch.object(history, '_indexes', {}):
+            os.makedirs(store.curated_dir('nfl'))
+            for seed in [3, 4]:
+                df = _curated(seed)
+                store.write_curated(df, 'nfl')
+                # Re-curating the data rebuilds the index
+                index = history.load_index('nfl')
+                self.assertIs(history.load_index('nfl'), index)
+                for team, opponent in [('A', 'B'), ('C', 'C'), ('A', 'Unseen')]:
+                    expected = df[(df['team'] == team) & (df['opponent'] == opponent)].reset_index(drop=True)
+                    expected['Winner'] = expected['team'].where(expected['points'] > expected['opp_points'],
+                                                                expected['opponent'])
+                    frame, x_opts, y_opts = history.populate('nfl', team, opponent)
+                    # Partition columns come back from the store last
+                    self.assertEqual(sorted(frame.columns), sorted(expected.columns))
+                    self.assertEqual(x_opts, [{'label': col, 'value': col} for col in frame.columns])
+                    pd.testing.assert_frame_equal(frame, expected[list(frame.columns)], check_dtype=False,
+                                                  check_categorical=False)
+                self.assertIsInstance(index.columns['team'], pd.Categorical)
@@ -0,0 +1,103 @@
+import tempfile
+from types import SimpleNamespace
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from sports_bettors.utils.cache import DiskCache
+from sports_bettors.utils.inference import flatten_pars, split_pars
+from sports_bettors.utils.nfl.models import NFLBettingAid
+
+from test_random_intercept import _synthetic
+
+
+class _Model(object):
+    """
+    Records the arguments of each `sampling` call and returns a fit with a fixed adaptation
+    """
+    def __init__(self, stepsize: float):
+        self.stepsize = stepsize
+        self.calls = []
+
+    def sampling(self, **kwargs):
+        self.calls.append(kwargs)
+        position = {'a': np.zeros(3), 'mu_a': 1., 'sigma_a': 2., 'sigma_y': 3., 'b': np.ones(2)}
+        return SimpleNamespace(get_stepsize=lambda: [self.stepsize] * kwargs['chains'],
+                               get_inv_metric=lambda: np.ones((kwargs['chains'], 8)),
+                               get_last_position=lambda: [dict(position) for _ in range(kwargs['chains'])])
+
+
+class TestInference(TestCase):
+    features = ['rushYards', 'rushAttempts', 'rush_yds_x_atms']
+
+    def test_split_pars(self):
+        # Laid out as `constrain_pars` returns them: model_pars in order, each flattened column-major
+        pars = {'a': np.arange(3.), 'mu_a': 7., 'sigma_a': 2., 'b': np.arange(6.).reshape((2, 3)) + 10,
+                'y_hat': np.arange(4.) + 20}
+        fit = SimpleNamespace(model_pars=list(pars.keys()), par_dims=[[3], [], [], [2, 3], [4]])
+        values = np.concatenate([np.ravel(value, order='F') for value in pars.values()])
+
+        split = split_pars(fit, list(values))
+        self.assertEqual(list(split.keys()), list(pars.keys()))
+        for name, value in pars.items():
+            np.testing.assert_array_equal(split[name], value)
+        self.assertEqual(flatten_pars(split)[0][-4:], ['y_hat[1]', 'y_hat[2]', 'y_hat[3]', 'y_hat[4]'])
+        with self.assertRaises(ValueError):
+            split_pars(fit, values[:-1])
+
+    def test_reuse_adaptation(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = DiskCache(path, max_bytes=1024 ** 2)
+            models = []
+            for response in ['Margin', 'TotalPoints', 'Margin', 'Win']:
+                aid = NFLBettingAid(random_effect='team', features='RushOnly', response=response, reuse_adaptation=True,
+                                    verbose=False)
+                aid.adaptation_cache = cache
+                aid.model = _Model(0.1 * (len(models) + 1))
+                aid._sample({'J': 3})
+                models.append(aid.model)
+            calls = [model.calls[0] for model in models]
+
+            # The first linear fit adapts, the others with the same layout reuse its step size and metric unchanged
+            self.assertEqual(calls[0]['iter'], 1000)
+            self.assertNotIn('control', calls[0])
+            for call in calls[1:3]:
+                self.assertLess(call['iter'], 1000)
+                self.assertEqual(call['control']['stepsize'], 0.1)
+                self.assertFalse(call['control']['adapt_engaged'])
+                np.testing.assert_array_equal(call['control']['inv_metric'], np.ones(8))
+            # Starting from the final draws of the same response only
+            self.assertNotIn('init', calls[1])
+            self.assertEqual(len(calls[2]['init']), 2)
+            self.assertEqual(sorted(calls[2]['init'][0].keys()), ['a', 'b', 'mu_a', 'sigma_a', 'sigma_y'])
+
+            # A bernoulli response has its own entry
+            self.assertEqual(calls[3]['iter'], 1000)
+            self.assertNotIn('control', calls[3])
+
+    def test_map_advi(self):
+        try:
+            import pystan  # noqa: F401
+        except ImportError:
+            self.skipTest('pystan is not installed')
+
+        data = _synthetic(self.features)
+        aid = NFLBettingAid(random_effect='team', features='RushOnly', response='Margin', iterations=1000,
+                            verbose=False)
+        # Fit the synthetic data in place of the curated data
+        aid.fit_transform = lambda df, skip_scaling=False: dict(data)
+
+        nuts = aid.fit(df=pd.DataFrame(), inference='nuts')[1]
+        nuts = nuts[nuts['labels'] != 'lp__'].set_index('labels')
+        for inference in ['map', 'advi']:
+            summary = aid.fit(df=pd.DataFrame(), inference=inference)[1]
+            # Same labels (parameters and fitted values) as sampling, each summarized once
+            self.assertEqual(sorted(summary['labels']), sorted(nuts.index), inference)
+            self.assertEqual(summary.shape[0], nuts.shape[0], inference)
+            summary = summary.set_index('labels')
+            self.assertTrue(np.isfinite(summary[['mean', 'sd']].values).all(), inference)
+            self.assertTrue((summary['sd'] > 0).all(), inference)
+            for label in ['mu_a', 'sigma_y'] + ['b{}'.format(fdx) for fdx in range(len(self.features))]:
+                self.assertLess(abs(summary.loc[label, 'mean'] - nuts.loc[label, 'mean']),
+                                4 * nuts.loc[label, 'sd'] + 0.25, '{} {}'.format(inference, label))
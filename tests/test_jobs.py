@@ -0,0 +1,73 @@
+import time
+import threading
+from unittest import TestCase
+
+from sports_bettors.utils.cache import MemoryCache
+from sports_bettors.dashboard.jobs import JobQueue
+
+
+def _blocking(started: threading.Event, release: threading.Event, reports: bool = True):
+    """
+    A job that waits for `release` once started, reporting progress (or not, like a cached result) as it goes
+    """
+    def fn(value, report):
+        if reports:
+            report(0.5)
+        started.set()
+        release.wait(5.)
+        if reports:
+            report(0.9)
+        return value
+    return fn
+
+
+class TestJobQueue(TestCase):
+
+    def setUp(self):
+        self.jobs = JobQueue(MemoryCache(1024 ** 2), workers=2)
+
+    def _wait(self, job: str) -> dict:
+        deadline = time.time() + 5.
+        while self.jobs.status(job)['status'] in ['queued', 'running']:
+            self.assertLess(time.time(), deadline, 'job {} never finished'.format(job))
+            time.sleep(0.01)
+        return self.jobs.status(job)
+
+    def test_done_and_failed(self):
+        status = self._wait(self.jobs.submit('a', lambda value, report: value * 2, 21))
+        self.assertEqual((status['status'], status['result'], status['progress']), ('done', 42, 1.))
+
+        def fail(report):
+            raise ValueError('no model')
+        status = self._wait(self.jobs.submit('a', fail))
+        self.assertEqual((status['status'], status['error']), ('failed', 'no model'))
+        self.assertEqual(self.jobs.status(None)['status'], 'missing')
+
+    def test_superseded(self):
+        for reports in [True, False]:
+            started, release = threading.Event(), threading.Event()
+            first = self.jobs.submit('a', _blocking(started, release, reports=reports), 'first')
+            self.assertTrue(started.wait(5.))
+            second = self.jobs.submit('a', lambda value, report: value, 'second')
+            release.set()
+            # A running job stops at its next report, one that doesn't report isn't stored as done
+            self.assertEqual(self._wait(first)['status'], 'cancelled')
+            self.assertEqual(self._wait(second)['result'], 'second')
+
+        # Other sessions are unaffected
+        started, release = threading.Event(), threading.Event()
+        first = self.jobs.submit('a', _blocking(started, release), 'first')
+        self.assertTrue(started.wait(5.))
+        other = self.jobs.submit('b', lambda value, report: value, 'other')
+        release.set()
+        self.assertEqual(self._wait(first)['result'], 'first')
+        self.assertEqual(self._wait(other)['result'], 'other')
+
+    def test_evicted_session(self):
+        # A job whose session marker was evicted from the store hasn't been superseded
+        started, release = threading.Event(), threading.Event()
+        job = self.jobs.submit('a', _blocking(started, release), 'first')
+        self.assertTrue(started.wait(5.))
+        self.jobs.store.delete(self.jobs._session_key('a'))
+        release.set()
+        self.assertEqual(self._wait(job)['result'], 'first')
@@ -0,0 +1,242 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+from scipy.stats import norm
+
+from sports_bettors.base import BetPredictor
+from sports_bettors.predictor_set import CompiledPredictorSet, bounds
+from sports_bettors.registry import PredictorSet
+from sports_bettors.utils.features import create_features
+from sports_bettors.utils.nfl import features as nfl_features
+from sports_bettors.dashboard.params import params
+from sports_bettors.dashboard.utils import results
+from sports_bettors.dashboard.utils.cube import ResultsCube
+
+from config import Config
+
+responses = ['Win', 'WinMargin', 'LossMargin', 'Margin', 'TotalPoints']
+
+
+def _predictors(feature_sets: dict, teams: list = ('A', 'B', 'C'), seed: int = 187) -> dict:
+    """
+    {(random_effect, feature_set, response): BetPredictor} with random parameters; team models haven't seen the last
+    team and opponent models the first, so each falls back to its global intercept for one of them
+    """
+    rng = np.random.RandomState(seed)
+    predictors = {}
+    for random_effect in ['team', 'opponent']:
+        for feature_set, features in feature_sets.items():
+            for response in responses:
+                seen = teams[:-1] if random_effect == 'team' else teams[1:]
+                calculator = {
+                    'random_effect': {team: tuple(np.sort(rng.standard_normal(3))) for team in seen},
+                    'coefficients': {feature: tuple(np.sort(rng.standard_normal(3))) for feature in features.features}
+                }
+                if response != 'Win':
+                    calculator['noise'] = tuple(np.sort(5. + 5. * rng.rand(3)))
+                scales = {feature: (10. * rng.standard_normal(), 1. + 20. * rng.rand())
+                          for feature in features.features}
+                predictors[(random_effect, feature_set, response)] = BetPredictor(
+                    scales, calculator, (rng.standard_normal(), rng.rand()))
+    return predictors
+
+
+class TestCompiledPredictorSet(TestCase):
+    teams = ['A', 'B', 'C', 'Unseen', None]
+
+    def setUp(self):
+        self.predictors = _predictors(nfl_features.feature_sets)
+        self.compiled = CompiledPredictorSet.from_predictors(self.predictors, 'nfl', 'test')
+        self.rng = np.random.RandomState(11)
+
+    def _rows(self, features: list) -> list:
+        """
+        Inputs for every team, the last one missing its first feature
+        """
+        rows = []
+        for team in self.teams:
+            row = {'RandomEffect': team}
+            row.update({feature: 50. * self.rng.standard_normal() for feature in features})
+            rows.append(row)
+        rows[-1].pop(features[0])
+        return rows
+
+    def test_predict_batch(self):
+        for (random_effect, feature_set, response), predictor in self.predictors.items():
+            features = nfl_features.feature_sets[feature_set].features
+            rows = self._rows(features)
+            expected = [predictor(row) for row in rows]
+
+            # The predictor's own batch path, which imputes absent columns rather than missing values
+            batch = predictor.predict_batch(dict([('RandomEffect', [row['RandomEffect'] for row in rows[:-1]])] +
+                                                 [(feature, [row[feature] for row in rows[:-1]])
+                                                  for feature in features]))
+            for bound in bounds:
+                np.testing.assert_allclose(batch['mu'][bound], [output['mu'][bound] for output in expected[:-1]],
+                                           rtol=1e-10, atol=1e-10)
+
+            # Every response of the compiled set at once
+            compiled = self.compiled.predict_batch(
+                random_effect, feature_set, [row['RandomEffect'] for row in rows],
+                {feature: np.array([row.get(feature, np.nan) for row in rows]) for feature in features})
+            sdx = self.compiled.responses.index(response)
+            self.assertTrue(compiled['available'][sdx])
+            np.testing.assert_allclose(compiled['mu'][:, sdx, :],
+                                       [[output['mu'][bound] for bound in bounds] for output in expected],
+                                       rtol=1e-10, atol=1e-10)
+            if 'sigma' in expected[0]:
+                np.testing.assert_allclose(compiled['sigma'][sdx], [expected[0]['sigma'][bound] for bound in bounds])
+            else:
+                self.assertTrue(np.isnan(compiled['sigma'][sdx]).all())
+
+            # And the single-row layout of `BetPredictor`
+            for row, output in zip(rows, expected):
+                single = self.compiled.predict(random_effect, feature_set, row)[(random_effect, feature_set, response)]
+                self.assertEqual(sorted(single.keys()), sorted(output.keys()))
+                for key in output.keys():
+                    np.testing.assert_allclose([single[key][bound] for bound in bounds],
+                                               [output[key][bound] for bound in bounds], rtol=1e-10, atol=1e-10)
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.compiled.save(path)
+            loaded = CompiledPredictorSet.load(path)
+            self.assertEqual(loaded.token, self.compiled.token)
+            row = {'RandomEffect': 'B', 'rushYards': 120., 'rushAttempts': 25.}
+            self.assertEqual(loaded.predict('team', 'RushOnly', row), self.compiled.predict('team', 'RushOnly', row))
+
+            # Each save swaps in new arrays, keeping the previous ones for readers that loaded the old index
+            tokens = [loaded.token]
+            for _ in range(2):
+                self.compiled.save(path)
+                tokens.append(self.compiled.token)
+            self.assertEqual(sorted(fn for fn in os.listdir(path) if fn.startswith('arrays_')), sorted(tokens[1:]))
+            self.assertEqual(CompiledPredictorSet.load(path).token, tokens[-1])
+
+    def test_cube_round_trip(self):
+        arrays = {'RushOnly.rushYards.variable_vals': np.arange(5.),
+                  'RushOnly.rushYards.win.team': self.rng.standard_normal((3, 5, 3)).astype(np.float16)}
+        with tempfile.TemporaryDirectory() as path:
+            ResultsCube.save(path, {'teams': ['A', 'B'], 'token': 'synthetic', 'parameters': {}}, arrays)
+            loaded = ResultsCube.load(path)
+            self.assertEqual(sorted(loaded.arrays.keys()), sorted(arrays.keys()))
+            for name, values in arrays.items():
+                np.testing.assert_array_equal(loaded.arrays[name], values)
+            np.testing.assert_array_equal(loaded.slice('B', 'Unseen', 'RushOnly', 'rushYards')['win.team'],
+                                          arrays['RushOnly.rushYards.win.team'][1])
+
+
+def _reference(predictors: dict, feature_set: str, team: str, opponent: str, variable: str, parameters: dict) -> tuple:
+    """
+    Win, margin and total points frames predicted one variable value at a time with the scalar predictors, as the
+    dashboard computed them before results were batched
+    """
+    version_params = params[Config.sb_version]
+    inputs = [p['value'] for p in version_params['variable-opts']['nfl'][feature_set]]
+    derived = [feature for feature in nfl_features.feature_sets[feature_set].features if feature not in inputs]
+    win, margins, totals = {}, [], []
+    for random_effect, random_effect_val in [('team', team), ('opponent', opponent)]:
+        suffix = '_team' if random_effect == 'team' else '_opp'
+        records = []
+        for val in version_params['variable-ranges']['nfl'][variable]:
+            row = dict(parameters, **{variable: val})
+            create_features(row, derived, nfl_features.feature_creators)
+            row['RandomEffect'] = random_effect_val
+            output = predictors[(random_effect, feature_set, 'Win')](row)
+            records.append({variable: val, 'WinLB' + suffix: expit(output['mu']['lb']),
+                            'Win' + suffix: expit(output['mu']['mean']), 'WinUB' + suffix: expit(output['mu']['ub'])})
+
+            for response in ['WinMargin', 'LossMargin', 'Margin', 'TotalPoints']:
+                if (feature_set == 'PointsScored') and (response == 'TotalPoints'):
+                    continue
+                output = predictors[(random_effect, feature_set, response)](row)
+                mu, sigma = output['mu'], output['sigma']
+                thresholds = np.array(list(version_params['response-ranges']['nfl'][response]))
+                prob = 1 - norm.cdf(thresholds, mu['mean'], sigma['mean'])
+                frame = pd.DataFrame({
+                    'variable_val': val,
+                    'Probability': prob,
+                    'Probability_LB': prob - (1. - norm.cdf(thresholds, mu['lb'], sigma['ub'])),
+                    'Probability_UB': (1. - norm.cdf(thresholds, mu['ub'], sigma['ub'])) - prob
+                })
+                if response == 'TotalPoints':
+                    frame['TotalPoints'] = thresholds
+                    totals.append(frame)
+                else:
+                    frame['Margin'] = -thresholds if response == 'LossMargin' else thresholds
+                    frame['Result'] = {'WinMargin': 'Win', 'LossMargin': 'Loss', 'Margin': 'Any'}[response]
+                    margins.append(frame)
+        win[random_effect] = pd.DataFrame.from_records(records)
+
+    df_win = win['team'].merge(win['opponent'], on=variable, how='inner')
+    df_win['Win'] = df_win['Win_team'] / (df_win['Win_team'] + (1 - df_win['Win_opp']))
+    df_win['WinUB'] = abs(df_win['WinUB_team'] / (df_win['WinUB_team'] + (1 - df_win['WinLB_opp'])) - df_win['Win'])
+    df_win['WinLB'] = abs(df_win['Win'] - df_win['WinLB_team'] / (df_win['WinLB_team'] + (1 - df_win['WinUB_opp'])))
+
+    aggs = dict(Probability=('Probability', 'mean'), Probability_LB=('Probability_LB', 'mean'),
+                Probability_UB=('Probability_UB', 'mean'))
+    df_margins = pd.concat(margins).groupby(['variable_val', 'Margin', 'Result']).agg(**aggs).reset_index()
+    df_totals = pd.concat(totals).groupby(['variable_val', 'TotalPoints']).agg(**aggs).reset_index() if totals else \
+        pd.DataFrame().from_records([])
+
+    return df_win, df_margins, df_totals
+
+
+class _Registry(object):
+    """
+    Serves one compiled set in place of the results directory
+    """
+    def __init__(self, compiled: CompiledPredictorSet):
+        self.compiled = compiled
+
+    def get(self, league: str, version: str = Config.sb_version) -> PredictorSet:
+        return PredictorSet(None, self.compiled, None)
+
+    def token(self, league: str, version: str = Config.sb_version) -> str:
+        return 'synthetic'
+
+
+class TestResultsPopulator(TestCase):
+
+    def setUp(self):
+        self.predictors = _predictors(nfl_features.feature_sets)
+        patches = [mock.patch.object(results, 'registry', _Registry(
+                       CompiledPredictorSet.from_predictors(self.predictors, 'nfl', 'test'))),
+                   mock.patch.object(results, 'load_cube', lambda league: None)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_frames(self):
+        rng = np.random.RandomState(5)
+        for feature_set, opts in params[Config.sb_version]['variable-opts']['nfl'].items():
+            for vdx, variable in enumerate([opt['value'] for opt in opts]):
+                parameters = {opt['value']: float(rng.randint(5, 100)) for opt in opts if opt['value'] != variable}
+                # Alternate with an unseen opponent to exercise the global intercepts
+                team, opponent = [('A', 'B'), ('B', 'Unseen')][vdx % 2]
+                populator = results.ResultsPopulator(league='nfl', feature_set=feature_set, team=team,
+                                                     opponent=opponent, variable=variable, parameters=dict(parameters))
+                df_win, df_margins, df_totals = _reference(self.predictors, feature_set, team, opponent, variable,
+                                                           parameters)
+                pd.testing.assert_frame_equal(populator.win(), df_win, check_exact=False, rtol=1e-9)
+                pd.testing.assert_frame_equal(populator.margins(), df_margins, check_exact=False, rtol=1e-9,
+                                              atol=1e-12)
+                pd.testing.assert_frame_equal(populator.total_points(), df_totals, check_exact=False, rtol=1e-9,
+                                              atol=1e-12)
+
+    def test_default_parameters(self):
+        # Blank inputs take the training mean of the models fit on every game
+        for feature_set, opts in params[Config.sb_version]['variable-opts']['nfl'].items():
+            variable = opts[0]['value']
+            defaults = results.default_parameters('nfl', feature_set, variable)
+            self.assertEqual(sorted(defaults.keys()), sorted([opt['value'] for opt in opts[1:]]))
+            for feature, val in defaults.items():
+                self.assertAlmostEqual(val, np.mean([
+                    self.predictors[(random_effect, feature_set, response)].scales[feature][0]
+                    for random_effect in ['team', 'opponent'] for response in results.unfiltered_responses
+                ]))
+        self.assertEqual(results.default_parameters('nfl', 'Defense', 'rushYards'), {})
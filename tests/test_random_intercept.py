@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from sports_bettors.utils.random_intercept import fit_random_intercept
+
+
+def _synthetic(features: list, n_groups: int = 12, n_obs: int = 400, seed: int = 187) -> dict:
+    """
+    pystan_data (as from `fit_transform`) for y = a[RandomEffect] + X * b + noise
+    """
+    rng = np.random.RandomState(seed)
+    group = np.sort(np.r_[np.arange(n_groups), rng.randint(0, n_groups, n_obs - n_groups)])
+    x = rng.standard_normal((n_obs, len(features)))
+    a = 3. + 2. * rng.standard_normal(n_groups)
+    b = np.linspace(1.5, -0.5, len(features))
+    data = {feature: x[:, fdx] for fdx, feature in enumerate(features)}
+    data.update({'N': n_obs, 'J': n_groups, 'RandomEffect': group + 1,
+                 'y': a[group] + x.dot(b) + 4. * rng.standard_normal(n_obs)})
+    return data
+
+
+def _dense_gls(data: dict, features: list, log_ratio: float) -> tuple:
+    """
+    Fixed effects, intercept predictions, sigma_y and negative REML likelihood from the full N x N covariance
+    """
+    y = data['y']
+    n_obs = y.shape[0]
+    z = np.eye(data['J'])[data['RandomEffect'] - 1]
+    w = np.column_stack([np.ones(n_obs)] + [data[feature] for feature in features])
+    v_inv = np.linalg.inv(np.eye(n_obs) + np.exp(log_ratio) * z.dot(z.T))
+    a = w.T.dot(v_inv).dot(w)
+    beta = np.linalg.solve(a, w.T.dot(v_inv).dot(y))
+    residual = y - w.dot(beta)
+    rss = residual.dot(v_inv).dot(residual)
+    dof = n_obs - w.shape[1]
+    neg_reml = 0.5 * (dof * np.log(rss / dof) - np.linalg.slogdet(v_inv)[1] + np.linalg.slogdet(a)[1])
+    intercepts = beta[0] + np.exp(log_ratio) * z.T.dot(v_inv).dot(residual)
+    return beta, intercepts, np.sqrt(rss / dof), neg_reml
+
+
+class TestRandomIntercept(TestCase):
+    features = ['rushYards', 'rushAttempts', 'rush_yds_x_atms']
+
+    def test_dense_gls(self):
+        data = _synthetic(self.features)
+        summary = fit_random_intercept(data, self.features).set_index('labels')['mean']
+        sigma_a, sigma_y = summary['sigma_a'], summary['sigma_y']
+        log_ratio = 2 * np.log(sigma_a / sigma_y)
+        beta, intercepts, dense_sigma_y, neg_reml = _dense_gls(data, self.features, log_ratio)
+
+        # Same GLS / BLUP solution at the estimated variance ratio
+        fixed = summary[['mu_a'] + ['b{}'.format(fdx) for fdx in range(len(self.features))]].values
+        np.testing.assert_allclose(fixed, beta, rtol=1e-6, atol=1e-8)
+        np.testing.assert_allclose(summary[['a[{}]'.format(j + 1) for j in range(data['J'])]].values, intercepts,
+                                   rtol=1e-6, atol=1e-8)
+        self.assertAlmostEqual(sigma_y, dense_sigma_y, places=6)
+
+        # The variance ratio maximizes the restricted likelihood
+        for shift in [-0.1, 0.1]:
+            self.assertLess(neg_reml, _dense_gls(data, self.features, log_ratio + shift)[3])
+
+        # Fitted values are the intercepts plus the fixed effects
+        x = np.column_stack([data[feature] for feature in self.features])
+        y_hat = summary[['y_hat[{}]'.format(idx + 1) for idx in range(data['N'])]].values
+        np.testing.assert_allclose(y_hat, intercepts[data['RandomEffect'] - 1] + x.dot(beta[1:]), rtol=1e-6)
+
+    def test_unfitted(self):
+        data = _synthetic(self.features)
+        fitted = fit_random_intercept(data, self.features)
+        summary = fit_random_intercept(data, self.features, fitted=False)
+        self.assertFalse(summary['labels'].str.contains('y_hat').any())
+        pd.testing.assert_frame_equal(summary, fitted[~fitted['labels'].str.contains('y_hat')].reset_index(drop=True))
+
+    def test_nuts(self):
+        try:
+            import pystan  # noqa: F401
+        except ImportError:
+            self.skipTest('pystan is not installed')
+        from sports_bettors.utils.nfl.models import NFLBettingAid
+
+        data = _synthetic(self.features)
+        aid = NFLBettingAid(random_effect='team', features='RushOnly', response='Margin', iterations=2000,
+                            verbose=False)
+        self.assertEqual(aid.features, self.features)
+        # Fit the synthetic data in place of the curated data
+        aid.fit_transform = lambda df, skip_scaling=False: dict(data)
+
+        reml = aid.fit(df=pd.DataFrame(), inference='reml')[1].set_index('labels')
+        nuts = aid.fit(df=pd.DataFrame(), inference='nuts')[1].set_index('labels')
+        labels = ['mu_a', 'sigma_y'] + ['b{}'.format(fdx) for fdx in range(len(self.features))] + \
+            ['a[{}]'.format(j + 1) for j in range(data['J'])]
+        for label in labels:
+            self.assertLess(abs(reml.loc[label, 'mean'] - nuts.loc[label, 'mean']), 3 * nuts.loc[label, 'sd'] + 0.05,
+                            label)
@@ -0,0 +1,151 @@
+import threading
+from unittest import TestCase, mock
+
+import numpy as np
+
+from sports_bettors import serving
+from sports_bettors.predictor_set import CompiledPredictorSet, bounds
+from sports_bettors.utils.nfl import features as nfl_features
+
+from test_predictors import _predictors, _Registry
+
+from config import Config
+
+
+class _LoadedRegistry(_Registry):
+    def loaded(self) -> list:
+        return [('nfl', Config.sb_version)]
+
+
+def _request(**kwargs) -> dict:
+    request = {'league': 'nfl', 'random_effect': 'team', 'feature_set': 'RushOnly',
+               'inputs': {'RandomEffect': 'A', 'rushYards': 120, 'rushAttempts': 25.5}}
+    request.update(kwargs)
+    return request
+
+
+class TestServing(TestCase):
+
+    def setUp(self):
+        self.predictors = _predictors(nfl_features.feature_sets)
+        self.compiled = CompiledPredictorSet.from_predictors(self.predictors, 'nfl', 'test')
+        patch = mock.patch.object(serving, 'registry', _LoadedRegistry(self.compiled))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_validate(self):
+        self.assertEqual(serving.validate(_request())['version'], Config.sb_version)
+        self.assertEqual(serving.validate(_request(version='v1'))['version'], 'v1')
+        invalid = [
+            ['league', 'random_effect'],
+            {'league': 'nfl', 'random_effect': 'team', 'feature_set': 'RushOnly'},
+            _request(random_effect='season'),
+            _request(feature_set='Defense'),
+            _request(league=['nfl']),
+            _request(inputs=['A', 120, 25]),
+            _request(inputs='A'),
+            _request(inputs={'rushYards': 120}),
+            _request(inputs={'RandomEffect': 'A', 'rushYards': '120'}),
+            _request(inputs={'RandomEffect': 'A', 'rushYards': True}),
+        ]
+        for request in invalid:
+            with self.assertRaises(ValueError, msg=str(request)):
+                serving.validate(request)
+
+        # Leagues and versions name directories, anything but a known league and a vN version never reaches them
+        traversal = [
+            _request(league='../../../../../../tmp/evil'),
+            _request(league='nfl/../../../tmp'),
+            _request(version='../../../../tmp/evil'),
+            _request(version='v2/../../x'),
+            _request(version='v2\n'),
+            _request(version='2'),
+        ]
+        with mock.patch.object(serving.registry, 'get', side_effect=AssertionError('registry accessed')):
+            for request in traversal:
+                with self.assertRaises(ValueError, msg=str(request)):
+                    serving.validate(request)
+                with self.assertRaises(ValueError, msg=str(request)):
+                    serving.predict(request['league'], request['random_effect'], request['feature_set'],
+                                    request['inputs'], version=request.get('version', Config.sb_version))
+
+    def _expected(self, request: dict) -> dict:
+        """
+        {response: output} of the scalar predictors for a request
+        """
+        return {response: predictor(request['inputs']) for (random_effect, feature_set, response), predictor
+                in self.predictors.items()
+                if (random_effect, feature_set) == (request['random_effect'], request['feature_set'])}
+
+    def _assert_outputs(self, outputs: dict, expected: dict):
+        self.assertEqual(sorted(outputs.keys()), sorted(expected.keys()))
+        for response, output in expected.items():
+            for key in output.keys():
+                np.testing.assert_allclose([outputs[response][key][bound] for bound in bounds],
+                                           [output[key][bound] for bound in bounds], rtol=1e-10, atol=1e-10)
+
+    def test_micro_batcher(self):
+        rng = np.random.RandomState(3)
+        requests = []
+        for idx in range(64):
+            feature_set = ['RushOnly', 'PassOnly'][idx % 2]
+            inputs = {'RandomEffect': ['A', 'B', 'C', 'Unseen'][idx % 4]}
+            # Derived features are left out and imputed
+            inputs.update({feature: float(rng.randint(5, 300)) for feature in
+                           nfl_features.feature_sets[feature_set].features if '_x_' not in feature})
+            requests.append(_request(random_effect=['team', 'opponent'][idx // 2 % 2], feature_set=feature_set,
+                                     inputs=inputs))
+
+        # Requests from many threads land in a few batches and each gets its own rows back
+        batcher = serving.MicroBatcher(window=0.05)
+        outputs = [None] * len(requests)
+
+        def _predict(idx: int):
+            outputs[idx] = batcher.predict(requests[idx], timeout=5.)
+
+        threads = [threading.Thread(target=_predict, args=(idx,)) for idx in range(len(requests))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for request, output in zip(requests, outputs):
+            self._assert_outputs(output, self._expected(request))
+
+        # Invalid requests raise before they're queued; unvalidated ones fail their own future and the worker carries on
+        with self.assertRaises(ValueError):
+            batcher.predict(_request(feature_set='Defense'))
+        failed = [batcher.submit(_request()), batcher.submit(dict(_request(version='v2'), feature_set='Defense'))]
+        for future in failed:
+            with self.assertRaises(KeyError):
+                future.result(timeout=5.)
+        self._assert_outputs(batcher.predict(_request(), timeout=5.), self._expected(_request()))
+
+    def test_blueprint(self):
+        try:
+            from flask import Flask
+        except ImportError:
+            self.skipTest('flask is not installed')
+        from sports_bettors import service
+
+        patch = mock.patch.object(service, 'registry', _LoadedRegistry(self.compiled))
+        patch.start()
+        self.addCleanup(patch.stop)
+        app = Flask(__name__)
+        app.register_blueprint(service.predict_blueprint)
+        client = app.test_client()
+
+        response = client.post('/predict', json=_request())
+        self.assertEqual(response.status_code, 200)
+        self._assert_outputs(response.get_json()['predictions'], self._expected(_request()))
+
+        response = client.post('/predict', json={'requests': [_request(), _request(inputs='A')]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.get_json()['results']], [200, 400])
+
+        self.assertEqual(client.post('/predict', data='not json').status_code, 400)
+        self.assertEqual(client.post('/predict', json=_request(league='../../../../../../tmp/evil')).status_code, 400)
+        self.assertEqual(client.post('/predict', json=_request(version='../../../../tmp/evil')).status_code, 400)
+        self.assertEqual(client.post('/predict?timeout=soon', json=_request()).status_code, 400)
+        self.assertEqual(client.post('/predict', json={'requests': 'A'}).status_code, 400)
+        self.assertEqual(client.get('/health').status_code, 200)
+        self.assertEqual(client.get('/ready').status_code, 200)
@@ -0,0 +1,30 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import numpy as np
+import pandas as pd
+
+from sports_bettors.utils import store
+
+from config import Config
+
+
+class TestStore(TestCase):
+
+    def test_csv_order(self):
+        # Seasons out of order and interleaved, as curation appends them
+        rng = np.random.RandomState(7)
+        df = pd.DataFrame({'year': rng.choice([2019, 2009, 2010], 50), 'team': rng.choice(['A', 'B', 'C'], 50),
+                           'opponent': rng.choice(['A', 'B', 'C'], 50), 'rushYards': rng.rand(50)})
+        with tempfile.TemporaryDirectory() as path, mock.patch.object(Config, 'DATA_DIR', path):
+            os.makedirs(store.curated_dir('nfl'))
+            store.write_curated(df, 'nfl')
+            csv = pd.read_csv(os.path.join(store.curated_dir('nfl'), 'df_curated.csv'))
+
+            pd.testing.assert_frame_equal(store.read_curated('nfl')[list(csv.columns)], csv)
+            pd.testing.assert_frame_equal(store.read_curated('nfl', columns=['rushYards', 'year']),
+                                          csv[['rushYards', 'year']])
+            filtered = csv[csv['team'].isin(['B', 'C']) & csv['year'].isin([2009, 2019])].reset_index(drop=True)
+            pd.testing.assert_frame_equal(
+                store.read_curated('nfl', teams=['C', 'B'], seasons=[2019, 2009])[list(csv.columns)], filtered)